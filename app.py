@@ -1,16 +1,38 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from werkzeug.utils import secure_filename
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 import os
 import json
-import csv
-import io
+import time
+import hashlib
+from urllib.parse import urlencode
 from datetime import datetime
 from main import run_qna_pipeline
-from scorer import get_similarity_scores, evaluate_qa_pairs
+from scorer import evaluate_qa_pairs
+from running_scores import final_score, get_running_scorer, summarize
+from embedding_cache import get_cache
+from llm_cache import get_llm_cache
+import model_registry
+import metrics
+from metrics import span
+from profiler import Sampler, get_profiler
+from results_store import get_store
+from leaderboard import Leaderboard
+from mail_queue import get_mail_queue
+from jobs import QueueFullError, get_job_manager
+from extraction import store_upload, extract_text
+from jd_registry import get_jd_registry
+from search_index import get_search_index
+from bulk_screening import TOP_N as BULK_TOP_N, collect_resumes, screen
+from sessions import get_session_manager
+from interview_history import InterviewHistory
+from transcript_log import ANSWER, SUBMISSION, TranscriptLog
+from csv_export import (DASHBOARD_HEADER, dashboard_row, export_results_to_csv, iter_csv, iter_encoded,
+                        rebuild_results_csv)
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Zero-argument callable returning a Gemini client; tests can swap in a fake
+app.config['GEMINI_CLIENT_FACTORY'] = None
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -18,26 +40,120 @@ os.makedirs('data', exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 
 # File paths
-TOP_FILE = 'data/top.json'
 RESULTS_FILE = 'data/interview_results.json'
-SESSIONS_FILE = 'data/active_sessions.json'
+
+# Profiling (see profiler.py) needs PROFILER_TOKEN set and sent in this header
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+PROFILE_HEADER = 'X-Profile'
+
+# Interview endpoints are scoped to a session, sent as a header, a
+# session_id parameter, or the cookie set by /upload
+SESSION_HEADER = 'X-Session-Id'
+SESSION_COOKIE = 'interview_session'
 
 # Initialize data files if they don't exist
 def initialize_data_files():
-    if not os.path.exists(TOP_FILE):
-        with open(TOP_FILE, 'w') as f:
-            json.dump([], f)
-    
     if not os.path.exists(RESULTS_FILE):
         with open(RESULTS_FILE, 'w') as f:
             json.dump([], f)
-    
-    if not os.path.exists(SESSIONS_FILE):
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump({}, f)
 
 initialize_data_files()
 
+# Opens the results database and imports interview_results.json on first run
+get_store()
+
+# Top candidates, overall and per position, kept in memory
+leaderboard = Leaderboard(get_store())
+
+# Scrape-time gauges for /metrics; both read shared SQLite state, so any worker reports the total
+metrics.get_registry().gauge(
+    'hireiq_jobs', 'Unfinished background jobs by status.',
+    lambda: {(('status', s),): n for s, n in get_job_manager().counts().items()})
+metrics.get_registry().gauge(
+    'hireiq_mail_outbox', 'HR notification outbox rows by status.',
+    lambda: {(('status', s),): n for s, n in get_mail_queue().stats().items()})
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed responses are timed to the first byte, not to the end of the body
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+def admin_token():
+    # Header only: a query-string token would end up in access logs and saved profile paths
+    return request.headers.get(ADMIN_TOKEN_HEADER)
+
+def profiled_path():
+    """The request path and query for a saved profile, minus any token parameter"""
+    args = [(k, v) for k, v in request.args.items(multi=True) if k != 'token']
+    return request.path + ('?' + urlencode(args) if args else '')
+
+@app.before_request
+def start_profiling():
+    """Sample this request's stack when flagged (with the admin token) or when its endpoint is armed"""
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return
+    endpoint = request.url_rule.rule if request.url_rule else None
+    if request.headers.get(PROFILE_HEADER) or request.args.get('profile'):
+        if not profiler.authorized(admin_token()):
+            return
+        trigger = 'flag'
+    elif endpoint and profiler.is_armed(endpoint) and profiler.claim(endpoint):
+        trigger = 'armed'
+    else:
+        return
+    g.profile = (Sampler(interval=profiler.interval).start(), trigger)
+
+@app.after_request
+def save_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        sampler, trigger = profile
+        sampler.stop()
+        profile_id = get_profiler().save(
+            sampler,
+            endpoint=request.url_rule.rule if request.url_rule else None,
+            method=request.method,
+            path=profiled_path(),
+            status=response.status_code,
+            trigger=trigger
+        )
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.teardown_request
+def stop_profiling(exc):
+    # after_request is skipped when the view raised; do not leave the sampler running
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile[0].stop()
+
+def current_session_id():
+    """Session id from the header, the query/body, or the session cookie"""
+    data = request.get_json(silent=True) if request.is_json else None
+    return (
+        request.headers.get(SESSION_HEADER)
+        or request.args.get('session_id')
+        or (data or {}).get('session_id')
+        or request.form.get('session_id')
+        or request.cookies.get(SESSION_COOKIE)
+    )
+
+def current_session():
+    return get_session_manager().get(current_session_id())
+
 @app.route('/')
 def index():
     # Since your HTML is complete, we'll serve it directly
@@ -47,78 +163,239 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload():
     try:
-        resume = request.files['resume']
-        jd = request.files['jd']
+        resume = request.files.get('resume')
+        jd = request.files.get('jd')
+        # A registered JD (see /jds) can be referenced instead of uploading the file again
+        jd_id = request.form.get('jd_id') or None
 
-        if not resume or not jd:
+        if not resume or not (jd or jd_id):
             return jsonify({"status": "error", "message": "Both resume and job description files are required"})
 
+        if jd_id and get_jd_registry().get(jd_id, include_text=False) is None:
+            return jsonify({"status": "error", "message": f"Unknown job description id: {jd_id}"}), 404
+
         # Validate file types
         allowed_extensions = {'pdf', 'docx', 'txt'}
-        resume_ext = resume.filename.rsplit('.', 1)[1].lower() if '.' in resume.filename else ''
-        jd_ext = jd.filename.rsplit('.', 1)[1].lower() if '.' in jd.filename else ''
-        
-        if resume_ext not in allowed_extensions or jd_ext not in allowed_extensions:
-            return jsonify({"status": "error", "message": "Only PDF, DOCX, and TXT files are allowed"})
-
-        resume_filename = secure_filename(resume.filename)
-        jd_filename = secure_filename(jd.filename)
+        uploads = [resume] if jd_id else [resume, jd]
+        for upload_file in uploads:
+            ext = upload_file.filename.rsplit('.', 1)[1].lower() if '.' in upload_file.filename else ''
+            if ext not in allowed_extensions:
+                return jsonify({"status": "error", "message": "Only PDF, DOCX, and TXT files are allowed"})
 
-        # Add timestamp to avoid conflicts
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        resume_filename = f"{timestamp}_{resume_filename}"
-        jd_filename = f"{timestamp}_{jd_filename}"
 
-        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], resume_filename)
-        jd_path = os.path.join(app.config['UPLOAD_FOLDER'], jd_filename)
+        # Files are stored under their content hash, so a re-uploaded JD is written once
+        with span('upload.store_files'):
+            resume_path, resume_digest = store_upload(resume, app.config['UPLOAD_FOLDER'])
+            jd_path = None if jd_id else store_upload(jd, app.config['UPLOAD_FOLDER'])[0]
+
+        # Every upload starts a new interview session with its own history and transcript
+        session = get_session_manager().create(
+            resume=resume_path,
+            jd=jd_path,
+            jd_id=jd_id,
+            timestamp=timestamp
+        )
 
-        resume.save(resume_path)
-        jd.save(jd_path)
+        # Generate questions in the background; the client polls /jobs/<job_id>
+        # fresh=1 skips the prompt cache and asks Gemini for new questions
+        use_cache = request.form.get('fresh', '').lower() not in ('1', 'true', 'yes')
+        job_id = get_job_manager().submit(
+            'upload', generate_questions_job, session['id'], resume_path, jd_path,
+            app.config.get('GEMINI_CLIENT_FACTORY'), use_cache, jd_id,
+            resume_digest, resume.filename, jd.filename if jd else None
+        )
 
-        # Store file paths for current session
-        session_data = {
-            "resume": resume_path, 
-            "jd": jd_path,
-            "timestamp": timestamp
-        }
-        
-        with open('data/latest_files.json', 'w') as f:
-            json.dump(session_data, f)
+        response = jsonify({
+            "status": "success",
+            "session_id": session['id'],
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+            "events_url": f"/jobs/{job_id}/events",
+            "message": "Files uploaded, generating questions"
+        })
+        response.set_cookie(SESSION_COOKIE, session['id'], httponly=True, samesite='Lax')
+        return response, 202
 
-        # Clean up old transcript
-        transcript_path = os.path.join('data', 'transcript.txt')
-        if os.path.exists(transcript_path):
-            os.remove(transcript_path)
+    except QueueFullError as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": f"Upload failed: {str(e)}"})
 
-        # Generate questions
-        history_path = os.path.join('data', 'history.json')
-        result = run_qna_pipeline(resume_path, jd_path, history_path, flask_mode=True)
+def generate_questions_job(session_id, resume_path, jd_path, client_factory=None, use_cache=True, jd_id=None,
+                           resume_digest=None, resume_filename=None, jd_filename=None):
+    """Runs on the job pool: the Gemini round-trip for /upload, stored in the session"""
+    client = client_factory() if client_factory else None
+    result = run_qna_pipeline(resume_path, jd_path, None, flask_mode=True, client=client,
+                              use_cache=use_cache, jd_id=jd_id)
+
+    interview = InterviewHistory.from_questions(result['questions'])
+
+    def set_history(session):
+        session['interview'] = interview
+
+    get_session_manager().update(session_id, set_history)
+    # Clients send these ids back with each answer
+    result['question_ids'] = [item['id'] for item in interview.items]
+
+    # Embed the resume (and an uploaded JD) once, for /search; failures here
+    # must not cost the candidate their questions
+    try:
+        result['jd_id'] = index_upload(session_id, resume_path, resume_digest, resume_filename,
+                                       jd_path, jd_id, jd_filename)
+    except Exception as e:
+        print(f"Error indexing upload: {e}")
+    return result
+
+def index_upload(session_id, resume_path, resume_digest, resume_filename, jd_path=None, jd_id=None, jd_filename=None):
+    """Add the resume to the search index and register an uploaded JD; returns the JD id"""
+    if jd_id is None and jd_path:
+        jd_id = get_jd_registry().create(extract_text(jd_path), source_filename=jd_filename)['id']
+    resume_id = resume_digest or os.path.splitext(os.path.basename(resume_path))[0]
+    get_search_index().add(resume_id, extract_text(resume_path, resume_digest), filename=resume_filename,
+                           session_id=session_id, jd_id=jd_id)
+    return jd_id
+
+@app.route('/bulk-screen', methods=['POST'])
+def bulk_screen():
+    """
+    Screen many resumes against one JD in a background job: a zip archive of
+    resumes as 'resumes', plus a 'jd' file or a registered jd_id. Optional
+    form fields: top_n (resumes that get questions), position, fresh=1.
+    Poll /jobs/<job_id> for progress; the shortlist lands in the results store.
+    """
+    try:
+        archive = request.files.get('resumes')
+        jd = request.files.get('jd')
+        jd_id = request.form.get('jd_id') or None
+
+        if not archive or not (jd or jd_id):
+            return jsonify({"status": "error", "message": "A zip of resumes and a job description are required"}), 400
+        if not archive.filename.lower().endswith('.zip'):
+            return jsonify({"status": "error", "message": "Resumes must be uploaded as a .zip archive"}), 400
+        if jd_id and get_jd_registry().get(jd_id, include_text=False) is None:
+            return jsonify({"status": "error", "message": f"Unknown job description id: {jd_id}"}), 404
+
+        jd_text = None
+        if not jd_id:
+            ext = jd.filename.rsplit('.', 1)[1].lower() if '.' in jd.filename else ''
+            if ext not in {'pdf', 'docx', 'txt'}:
+                return jsonify({"status": "error", "message": "Only PDF, DOCX, and TXT files are allowed"})
+            jd_path, digest = store_upload(jd, app.config['UPLOAD_FOLDER'])
+            jd_text = extract_text(jd_path, digest)
+
+        with span('bulk.collect'):
+            resumes, skipped = collect_resumes(archive.stream, app.config['UPLOAD_FOLDER'])
+        if not resumes:
+            return jsonify({"status": "error", "message": "No PDF, DOCX, or TXT resumes found in the archive"}), 400
+
+        use_cache = request.form.get('fresh', '').lower() not in ('1', 'true', 'yes')
+        job_id = get_job_manager().submit_with_progress(
+            'bulk_screen', screen, resumes,
+            jd_text=jd_text,
+            jd_id=jd_id,
+            top_n=int(request.form.get('top_n', BULK_TOP_N)),
+            position=request.form.get('position') or None,
+            client_factory=app.config.get('GEMINI_CLIENT_FACTORY'),
+            use_cache=use_cache,
+            skipped=skipped
+        )
 
         return jsonify({
             "status": "success",
-            "result": result,
-            "message": "Files uploaded and questions generated successfully"
-        })
-
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+            "events_url": f"/jobs/{job_id}/events",
+            "resumes": len(resumes),
+            "skipped": skipped
+        }), 202
+
+    except QueueFullError as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({"status": "error", "message": f"Upload failed: {str(e)}"})
+        return jsonify({"status": "error", "message": f"Bulk screening failed: {str(e)}"})
+
+@app.route('/jds', methods=['POST'])
+def create_jd():
+    """
+    Register a job description once per role: upload it as the 'jd' file
+    (or send JSON {"text": ...}) with an optional title.
+    Registering identical text again returns the existing record.
+    """
+    try:
+        jd = request.files.get('jd')
+        if jd:
+            ext = jd.filename.rsplit('.', 1)[1].lower() if '.' in jd.filename else ''
+            if ext not in {'pdf', 'docx', 'txt'}:
+                return jsonify({"status": "error", "message": "Only PDF, DOCX, and TXT files are allowed"})
+            jd_path, digest = store_upload(jd, app.config['UPLOAD_FOLDER'])
+            text = extract_text(jd_path, digest)
+            title = request.form.get('title')
+            source_filename = jd.filename
+        else:
+            data = request.get_json(silent=True) or {}
+            text = data.get('text', '')
+            title = data.get('title')
+            source_filename = None
+
+        record = get_jd_registry().create(text, title=title, source_filename=source_filename)
+        record.pop('text', None)
+        return jsonify({'status': 'success', 'jd': record})
+
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/jds', methods=['GET'])
+def list_jds():
+    """List registered job descriptions (without their text)"""
+    return jsonify({'status': 'success', 'jds': get_jd_registry().list(request.args.get('limit', 100, type=int))})
+
+@app.route('/jds/<jd_id>', methods=['GET'])
+def get_jd(jd_id):
+    """Get one registered job description, including its extracted text"""
+    record = get_jd_registry().get(jd_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': 'Job description not found'}), 404
+    return jsonify({'status': 'success', 'jd': record})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a background job"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of a background job's state changes"""
+    return Response(
+        stream_with_context(get_job_manager().events(job_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route("/start-voice")
 def start_voice():
     try:
-        history_path = os.path.join("data", "history.json")
-        if not os.path.exists(history_path):
+        session = current_session()
+        if session is None or not len(session['interview']):
             return jsonify({"status": "error", "message": "No questions available. Please upload files first."})
 
-        with open(history_path, "r") as f:
-            history = json.load(f)
-
-        # Find next unanswered question
-        for item in history:
-            if item.get("answer") == "<user_input_required>":
-                return jsonify({"status": "success", "question": item["question"]})
+        # Next unanswered question, via the interview's pointer
+        item = session['interview'].next_unanswered()
+        if item is not None:
+            return jsonify({"status": "success", "question": item["question"], "question_id": item["id"]})
 
         return jsonify({"status": "done", "message": "All questions answered."})
 
@@ -132,31 +409,39 @@ def save_transcript():
     try:
         data = request.get_json()
         question = data.get("question", "").strip()
+        question_id = data.get("question_id")
         answer = data.get("answer", "").strip()
 
-        if not question:
+        if not question and not question_id:
             return jsonify({"status": "error", "message": "Missing question"}), 400
 
-        # Append to transcript file
-        with open("data/transcript.txt", "a", encoding="utf-8") as f:
-            f.write(f"Q: {question}\nA: {answer}\n\n")
+        session = current_session()
+        if session is None:
+            return jsonify({"status": "error", "message": "No active interview session. Please upload files first."}), 400
 
-        # Update history file
-        history_path = "data/history.json"
-        if os.path.exists(history_path):
-            with open(history_path, "r") as f:
-                history = json.load(f)
+        sessions = get_session_manager()
 
-            # Find and update the corresponding question
-            for item in history:
-                if item["question"].strip() == question.strip():
-                    item["answer"] = answer
-                    break
+        # Save the answer by question id (appends one row)
+        try:
+            question_id = sessions.record_answer(session['id'], answer, question_id=question_id, question=question)
+        except KeyError as e:
+            return jsonify({"status": "error", "message": str(e)}), 404
+        if not question:
+            question = session['interview'].get(question_id)['question']
+
+        # Append one record to the session's transcript log
+        record = sessions.transcript_log(session['id']).append(
+            ANSWER,
+            session_id=session['id'],
+            question_id=question_id,
+            question=question,
+            answer=answer
+        )
 
-            with open(history_path, "w") as f:
-                json.dump(history, f, indent=2)
+        # Score this answer now, in the background, so later scoring is a lookup
+        get_running_scorer().submit(session['id'])
 
-        return jsonify({"status": "success"})
+        return jsonify({"status": "success", "question_id": question_id, "offset": record['offset']})
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
@@ -173,8 +458,18 @@ def submit_interview():
         if not qa_pairs:
             return jsonify({'status': 'error', 'message': 'No Q&A pairs provided'})
 
-        # Evaluate the interview
-        score = evaluate_qa_pairs(qa_pairs)
+        # Use the session's running score when it scored exactly the submitted answers
+        session = current_session()
+        score = None
+        if session is not None:
+            running = session.get('running')
+            if get_running_scorer().pending(session):
+                running = get_running_scorer().advance(session['id'])
+            score = final_score(running, qa_pairs)
+
+        # Otherwise evaluate the submitted pairs
+        if score is None:
+            score = evaluate_qa_pairs(qa_pairs)
         
         # Create interview result
         interview_result = {
@@ -185,26 +480,24 @@ def submit_interview():
             'score': round(score, 3),
             'timestamp': datetime.now().isoformat(),
             'qa_pairs': qa_pairs,
-            'categories': generate_category_scores(score)
+            'categories': generate_category_scores(score),
+            'session_id': current_session_id()
         }
 
-        # Save to results file
-        try:
-            with open(RESULTS_FILE, 'r') as f:
-                results = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            results = []
-
-        results.append(interview_result)
-        
-        with open(RESULTS_FILE, 'w') as f:
-            json.dump(results, f, indent=2)
-
-        # Update top candidates
-        update_top_candidates(name, score)
+        # Save to results store and update top candidates
+        store = get_store()
+        version_before = store.version()
+        store.insert(interview_result)
+        leaderboard.add(interview_result, version_before)
+        # The HR attachment lists every result, not only those sent to /submit-result
+        export_results_to_csv([interview_result], store=store)
+        if session is not None:
+            get_search_index().annotate(session['id'], name=name, email=email, position=position)
 
         # Save detailed transcript
-        save_detailed_transcript(name, email, position, score, qa_pairs)
+        with span('transcript.save'):
+            save_detailed_transcript(name, email, position, score, qa_pairs,
+                                     session_id=session['id'] if session else None)
 
         return jsonify({'status': 'success', 'score': score})
         
@@ -236,60 +529,62 @@ def generate_category_scores(base_score):
     
     return scores
 
-def update_top_candidates(name, score):
-    """Update the top candidates list"""
-    try:
-        with open(TOP_FILE, 'r') as f:
-            top_candidates = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        top_candidates = []
-
-    # Add new candidate
-    top_candidates.append({
-        'name': name, 
-        'score': round(score * 100, 1),
-        'timestamp': datetime.now().isoformat()
-    })
-    
-    # Keep only top 10, sorted by score
-    top_candidates = sorted(top_candidates, key=lambda x: x['score'], reverse=True)[:10]
-
-    with open(TOP_FILE, 'w') as f:
-        json.dump(top_candidates, f, indent=2)
-
-def save_detailed_transcript(name, email, position, score, qa_pairs):
-    """Save detailed interview transcript"""
-    with open("data/transcript.txt", "a", encoding="utf-8") as f:
-        f.write("=" * 80 + "\n")
-        f.write(f"INTERVIEW TRANSCRIPT\n")
-        f.write(f"Candidate: {name}\n")
-        f.write(f"Email: {email}\n")
-        f.write(f"Position: {position}\n")
-        f.write(f"Overall Score: {round(score * 100, 1)}%\n")
-        f.write(f"Interview Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 80 + "\n\n")
-        
-        for i, pair in enumerate(qa_pairs, 1):
-            f.write(f"Question {i}: {pair['question']}\n")
-            f.write(f"Answer {i}: {pair['answer']}\n")
-            f.write("-" * 40 + "\n")
-        
-        f.write("\n" + "=" * 80 + "\n\n")
+def save_detailed_transcript(name, email, position, score, qa_pairs, session_id=None):
+    """Record the submitted interview in the transcript log (the session's, when there is one)"""
+    if session_id:
+        log = get_session_manager().transcript_log(session_id)
+    else:
+        log = TranscriptLog(os.path.join("data", "submissions.jsonl"))
+    log.append(
+        SUBMISSION,
+        session_id=session_id,
+        name=name,
+        email=email,
+        position=position,
+        score=score,
+        qa_pairs=qa_pairs
+    )
 
 @app.route('/get-results', methods=['GET'])
 def get_results():
-    """Get all interview results for the dashboard"""
+    """
+    Get one page of interview results for the dashboard.
+    Query params: limit, cursor, sort (timestamp|id), order (asc|desc),
+    position, min_score, max_score, since, until (ISO dates), fields (comma-separated),
+    type (screening: bulk-screening shortlists instead of interviews).
+    """
     try:
-        with open(RESULTS_FILE, 'r') as f:
-            results = json.load(f)
-        
-        # Sort by timestamp (most recent first)
-        results = sorted(results, key=lambda x: x['timestamp'], reverse=True)
-        
-        return jsonify({'status': 'success', 'results': results})
-        
-    except (FileNotFoundError, json.JSONDecodeError):
-        return jsonify({'status': 'success', 'results': []})
+        store = get_store()
+
+        # The store version changes on every write, so an unchanged dashboard refresh is a 304
+        etag = hashlib.sha1(f"{store.version()}:{request.query_string.decode()}".encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        args = request.args
+        fields = args.get('fields')
+        results, next_cursor = store.query(
+            position=args.get('position') or None,
+            min_score=args.get('min_score', type=float),
+            max_score=args.get('max_score', type=float),
+            since=args.get('since') or None,
+            until=args.get('until') or None,
+            cursor=args.get('cursor') or None,
+            limit=args.get('limit', 50, type=int),
+            sort=args.get('sort', 'timestamp'),
+            descending=args.get('order', 'desc').lower() != 'asc',
+            fields=[f.strip() for f in fields.split(',') if f.strip()] if fields else None,
+            result_type=args.get('type') or None
+        )
+
+        response = jsonify({'status': 'success', 'results': results, 'next_cursor': next_cursor})
+        response.set_etag(etag)
+        return response
+
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -297,14 +592,13 @@ def get_results():
 def delete_result(result_id):
     """Delete a specific interview result"""
     try:
-        with open(RESULTS_FILE, 'r') as f:
-            results = json.load(f)
-        
-        # Filter out the result to delete
-        results = [r for r in results if r['id'] != result_id]
-        
-        with open(RESULTS_FILE, 'w') as f:
-            json.dump(results, f, indent=2)
+        store = get_store()
+        version_before = store.version()
+        deleted = store.delete(result_id)
+        if deleted is not None:
+            leaderboard.remove(deleted, version_before)
+            # The HR attachment must not keep listing the deleted result
+            rebuild_results_csv(store)
         
         return jsonify({'status': 'success', 'message': 'Result deleted successfully'})
         
@@ -315,11 +609,10 @@ def delete_result(result_id):
 def clear_all_results():
     """Clear all interview results"""
     try:
-        with open(RESULTS_FILE, 'w') as f:
-            json.dump([], f)
-        
-        with open(TOP_FILE, 'w') as f:
-            json.dump([], f)
+        store = get_store()
+        store.clear()
+        leaderboard.rebuild()
+        rebuild_results_csv(store)
             
         return jsonify({'status': 'success', 'message': 'All results cleared successfully'})
         
@@ -328,43 +621,32 @@ def clear_all_results():
 
 @app.route('/export-results')
 def export_results():
-    """Export results as CSV"""
+    """
+    Export results as CSV, streamed row by row from the results store.
+    Optional filters: position, min_score, max_score, since, until,
+    after (exclusive timestamp, for incremental exports), gzip=1.
+    """
     try:
-        with open(RESULTS_FILE, 'r') as f:
-            results = json.load(f)
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Name', 'Email', 'Position', 'Overall Score (%)', 'Interview Date', 'Technical Knowledge (%)', 'Communication Skills (%)', 'Problem Solving (%)', 'Relevant Experience (%)', 'Cultural Fit (%)'])
-        
-        # Write data
-        for result in results:
-            date = datetime.fromisoformat(result['timestamp']).strftime('%Y-%m-%d %H:%M')
-            categories = {cat['name']: cat['score'] for cat in result.get('categories', [])}
-            
-            writer.writerow([
-                result['name'],
-                result.get('email', ''),
-                result.get('position', ''),
-                round(result['score'] * 100, 1),
-                date,
-                categories.get('Technical Knowledge', ''),
-                categories.get('Communication Skills', ''),
-                categories.get('Problem Solving', ''),
-                categories.get('Relevant Experience', ''),
-                categories.get('Cultural Fit', '')
-            ])
-        
-        # Create response
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode()),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'interview_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        args = request.args
+        compress = args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        results = get_store().iter_filtered(
+            position=args.get('position') or None,
+            min_score=args.get('min_score', type=float),
+            max_score=args.get('max_score', type=float),
+            since=args.get('since') or None,
+            until=args.get('until') or None,
+            after=args.get('after') or None
+        )
+
+        filename = f'interview_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        if compress:
+            filename += '.gz'
+
+        body = iter_encoded(iter_csv(results, DASHBOARD_HEADER, dashboard_row), compress=compress)
+        return Response(
+            stream_with_context(body),
+            mimetype='application/gzip' if compress else 'text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
@@ -372,37 +654,265 @@ def export_results():
 
 @app.route('/top-candidates', methods=['GET'])
 def top_candidates():
-    """Get top candidates"""
+    """Get top candidates, optionally for one ?position="""
     try:
-        with open(TOP_FILE, 'r') as f:
-            top = json.load(f)
+        top = leaderboard.top(request.args.get('position') or None)
         return jsonify({'status': 'success', 'candidates': top})
-    except (FileNotFoundError, json.JSONDecodeError):
-        return jsonify({'status': 'success', 'candidates': []})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/search', methods=['GET', 'POST'])
+def search_candidates():
+    """
+    Past candidates whose resumes best fit a registered JD (?jd_id=) or a
+    free-text query (?q=), best first. ?k= sets how many (default 10);
+    ?exact=1 scans every resume even when the index is partitioned.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        params = {**request.args.to_dict(), **data}
+        jd_id = params.get('jd_id')
+        query = (params.get('q') or '').strip()
+        k = max(1, min(int(params.get('k', 10)), 1000))
+        exact = str(params.get('exact', '')).lower() in ('1', 'true', 'yes')
+
+        index = get_search_index()
+        if jd_id:
+            embedding = get_jd_registry().get_embedding(jd_id)
+            if embedding is None:
+                return jsonify({'status': 'error', 'message': f'Unknown job description id: {jd_id}'}), 404
+            hits, scanned = index.search_vector(embedding, k, exact)
+        elif query:
+            hits, scanned = index.search_text(query, k, exact)
+        else:
+            return jsonify({'status': 'error', 'message': 'Provide a jd_id or a q search text'}), 400
+
+        return jsonify({
+            'status': 'success',
+            'candidates': index.results(hits),
+            'scanned': scanned,
+            'indexed': len(index)
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)})
+
 @app.route('/score-transcript', methods=['GET'])
 def score_transcript():
-    """Score existing transcript (legacy endpoint)"""
+    """Score the current session's transcript (legacy endpoint)"""
     try:
-        transcript_path = os.path.join("data", "transcript.txt")
-        if not os.path.exists(transcript_path):
+        session = current_session()
+        if session is None:
             return jsonify({"status": "error", "message": "No transcript found"})
 
-        scores = get_similarity_scores(transcript_path)
+        log = get_session_manager().transcript_log(session['id'])
+        if not log.size():
+            return jsonify({"status": "error", "message": "No transcript found"})
 
-        with open(os.path.join("data", "output.json"), "w", encoding="utf-8") as f:
-            json.dump(scores, f, indent=2)
+        # Answers are scored as they arrive; only catch up on any still in flight
+        running = session.get('running')
+        if get_running_scorer().pending(session):
+            running = get_running_scorer().advance(session['id'])
+        scores = summarize(running)
 
         return jsonify({'status': 'success', 'scores': scores})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/transcript')
+def export_transcript():
+    """Current session's transcript: human-readable text, or ?format=jsonl for the raw log"""
+    session = current_session()
+    if session is None:
+        return jsonify({"status": "error", "message": "No transcript found"}), 404
+
+    log = get_session_manager().transcript_log(session['id'])
+    if request.args.get('format') == 'jsonl':
+        records, _ = log.read_from(request.args.get('offset', 0, type=int))
+        body = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+        return Response(body, mimetype='application/x-ndjson')
+    return Response(log.render_text(), mimetype='text/plain')
+
+VOICE_READ_BYTES = 3200  # 100 ms of 16 kHz 16-bit mono
+
+def voice_streams():
+    """voice_utils needs webrtcvad/resemblyzer, which are optional; import on first use"""
+    from voice_utils import get_voice_streams
+    return get_voice_streams()
+
+def voice_sample_rate():
+    """?sample_rate= of a raw PCM body (default 16000), or None if VAD can't take it"""
+    from voice_utils import VAD_SAMPLE_RATES
+    sample_rate = request.args.get('sample_rate', 16000, type=int)
+    return sample_rate if sample_rate in VAD_SAMPLE_RATES else None
+
+def bad_sample_rate():
+    return jsonify({'status': 'error',
+                    'message': 'sample_rate must be one of 8000, 16000, 32000 or 48000'}), 400
+
+@app.route('/voice/enroll', methods=['POST'])
+def voice_enroll():
+    """Enroll the current session's speaker from a raw 16-bit mono PCM body (?sample_rate=, default 16 kHz)"""
+    session = current_session()
+    if session is None:
+        return jsonify({'status': 'error', 'message': 'No active interview session'}), 400
+    try:
+        streams = voice_streams()
+    except ImportError as e:
+        return jsonify({'status': 'error', 'message': f'Voice verification unavailable: {e}'}), 503
+
+    sample_rate = voice_sample_rate()
+    if sample_rate is None:
+        return bad_sample_rate()
+    body = request.get_data(cache=False)
+    if len(body) < sample_rate * 2:
+        return jsonify({'status': 'error', 'message': 'Need at least one second of audio'}), 400
+    try:
+        streams.voice().enroll_pcm(body, sample_rate, speaker_id=session['id'])
+        streams.close(session['id'])
+        return jsonify({'status': 'success', 'seconds': round(len(body) / (2.0 * sample_rate), 2)})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/voice/stream', methods=['POST'])
+def voice_stream():
+    """
+    Verify the speaker while audio is still uploading. The body is raw
+    16-bit mono PCM at ?sample_rate= (default 16 kHz), sent with chunked
+    transfer encoding (or in pieces, one request each); one JSON line per
+    checked window is streamed back.
+    """
+    session = current_session()
+    if session is None:
+        return jsonify({'status': 'error', 'message': 'No active interview session'}), 400
+    try:
+        sample_rate = voice_sample_rate()
+        if sample_rate is None:
+            return bad_sample_rate()
+        stream = voice_streams().get(session['id'], sample_rate=sample_rate)
+    except ImportError as e:
+        return jsonify({'status': 'error', 'message': f'Voice verification unavailable: {e}'}), 503
+
+    source = request.stream
+
+    def generate():
+        # Each read is handed to the stream as-is; it is viewed, not copied, from there on
+        while True:
+            piece = source.read(VOICE_READ_BYTES)
+            if not piece:
+                break
+            for event in stream.feed(piece):
+                yield json.dumps(event) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/health')
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    """Liveness check: the process is up, whether or not the models have loaded"""
+    return jsonify({
+        'status': 'healthy',
+        'ready': model_registry.is_ready(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/ready')
+def readiness_check():
+    """Readiness check: 503 until the scoring model is loaded"""
+    ready = model_registry.is_ready()
+    if not ready:
+        model_registry.load_in_background()
+    body = {
+        'status': 'ready' if ready else 'loading',
+        'models': model_registry.status(),
+        'timestamp': datetime.now().isoformat()
+    }
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format: stage timings, request latency and counters, summed over workers"""
+    return Response(metrics.get_registry().render(), mimetype='text/plain; version=0.0.4')
+
+def profiler_guard():
+    """None if the caller may use the profiling endpoints, else an error response"""
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return jsonify({'status': 'error', 'message': 'Profiling is disabled'}), 404
+    if not profiler.authorized(admin_token()):
+        return jsonify({'status': 'error', 'message': 'Invalid admin token'}), 403
+    return None
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Saved profiles (newest first) and endpoints armed for profiling"""
+    denied = profiler_guard()
+    if denied:
+        return denied
+    profiler = get_profiler()
+    return jsonify({
+        'status': 'success',
+        'profiles': profiler.list(request.args.get('limit', 100, type=int)),
+        'targets': profiler.targets()
+    })
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Collapsed stacks ('frame;frame;frame count'), for flamegraph.pl or speedscope"""
+    denied = profiler_guard()
+    if denied:
+        return denied
+    profiler = get_profiler()
+    if profiler.get(profile_id) is None:
+        return jsonify({'status': 'error', 'message': 'Profile not found'}), 404
+    with open(profiler.path(profile_id), 'r', encoding='utf-8') as f:
+        body = f.read()
+    return Response(body, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.folded'})
+
+@app.route('/profiles/targets', methods=['POST'])
+def arm_profiling():
+    """Profile the next `count` requests to `endpoint` (a route such as /score-transcript), on any worker"""
+    denied = profiler_guard()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    endpoint = data.get('endpoint', '')
+    count = data.get('count', 1)
+    if not any(rule.rule == endpoint for rule in app.url_map.iter_rules()):
+        return jsonify({'status': 'error', 'message': f'Unknown endpoint: {endpoint}'}), 400
+    if not isinstance(count, int) or count < 1:
+        return jsonify({'status': 'error', 'message': 'count must be a positive integer'}), 400
+    get_profiler().arm(endpoint, count)
+    return jsonify({'status': 'success', 'targets': get_profiler().targets()})
+
+@app.route('/profiles/targets', methods=['DELETE'])
+def disarm_profiling():
+    denied = profiler_guard()
+    if denied:
+        return denied
+    get_profiler().disarm(request.args.get('endpoint', ''))
+    return jsonify({'status': 'success', 'targets': get_profiler().targets()})
+
+@app.route('/cache-stats')
+def cache_stats():
+    """Embedding and Gemini prompt cache hit/miss counters"""
+    return jsonify({
+        'status': 'success',
+        'embedding_cache': get_cache().stats(),
+        'llm_cache': get_llm_cache().stats()
+    })
+
+@app.route('/mail-queue')
+def mail_queue_status():
+    """Outbox counts by status, plus the most recent permanent failures"""
+    queue = get_mail_queue()
+    return jsonify({'status': 'success', 'outbox': queue.stats(), 'failed': queue.failed()})
 
 @app.errorhandler(413)
 def too_large(e):
@@ -416,62 +926,23 @@ def not_found(e):
 def internal_error(e):
     return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
-import csv
-from dotenv import load_dotenv
-import smtplib
-from email.message import EmailMessage
-
-load_dotenv()
-
-def export_results_to_csv(results, filename='data/hr_results.csv'):
-    with open(filename, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        header = ['ID', 'Name', 'Email', 'Position', 'Score', 'Timestamp']
-        writer.writerow(header)
-        for r in results:
-            writer.writerow([
-                r.get('id'), r.get('name'), r.get('email'),
-                r.get('position'), r.get('score'), r.get('timestamp')
-            ])
-    return filename
-def send_email_with_csv(to_email, subject, body, attachment_path):
-    msg = EmailMessage()
-    msg['Subject'] = subject
-    msg['From'] = os.getenv('EMAIL_ADDRESS')
-    msg['To'] = to_email
-    msg.set_content(body)
-
-    # Attach the CSV file
-    with open(attachment_path, 'rb') as f:
-        file_data = f.read()
-        file_name = os.path.basename(attachment_path)
-    msg.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
-
-    # Send email
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-        smtp.login(os.getenv('EMAIL_ADDRESS'), os.getenv('EMAIL_PASSWORD'))
-        smtp.send_message(msg)
-
 @app.route('/submit-result', methods=['POST'])
 def submit_result():
     try:
         new_result = request.json  # or use request.form if form submission
-        results = []
-
-        if os.path.exists(RESULTS_FILE):
-            with open(RESULTS_FILE, 'r') as f:
-                results = json.load(f)
-
-        results.append(new_result)
+        new_result.setdefault('id', datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + str(hash(new_result.get('name'))))
+        new_result.setdefault('timestamp', datetime.now().isoformat())
 
-        with open(RESULTS_FILE, 'w') as f:
-            json.dump(results, f, indent=4)
+        store = get_store()
+        version_before = store.version()
+        store.insert(new_result)
+        leaderboard.add(new_result, version_before)
 
-        # ✅ Export to CSV
-        csv_path = export_results_to_csv(results)
+        # ✅ Export to CSV (appends the new row)
+        csv_path = export_results_to_csv([new_result], store=store)
 
-        # ✅ Send Email Immediately After Interview
-        send_email_with_csv(
+        # ✅ Queue the HR email; the mail worker sends it outside this request
+        get_mail_queue().enqueue(
             to_email=os.getenv('HR_EMAIL'),
             subject='New Interview Result Submitted',
             body='A new interview result has been submitted. Please find the attached CSV with all current results.',
@@ -480,7 +951,7 @@ def submit_result():
 
         return jsonify({
     'status': 'success',
-    'message': 'Result submitted and email sent to HR successfully.'
+    'message': 'Result submitted and email to HR queued successfully.'
 })
 
 
@@ -495,9 +966,14 @@ if __name__ == '__main__':
     print("Available endpoints:")
     print("  - / (Interview Interface)")
     print("  - /upload (File Upload)")
+    print("  - /bulk-screen (Bulk Screening)")
+    print("  - /search (Candidate Search)")
     print("  - /submit-interview (Submit Interview)")
     print("  - /get-results (Get Results)")
     print("  - /top-candidates (Top Candidates)")
     print("  - /export-results (Export CSV)")
-    
+    print("  - /health, /ready (Liveness / Readiness)")
+
+    model_registry.load_in_background()
+    get_mail_queue()
     app.run(debug=True, host='0.0.0.0', port=5000)
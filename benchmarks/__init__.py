@@ -0,0 +1,11 @@
+"""
+Benchmarks for scoring, extraction, the results store and the Flask endpoints.
+
+    python -m benchmarks                      # stub encoder and Gemini client
+    python -m benchmarks --quick              # small sizes, 5 iterations
+    python -m benchmarks --real-model         # real SentenceTransformer
+    python -m benchmarks --compare benchmarks/results/<baseline>.json
+
+Each run works in a scratch directory and writes p50/p95/p99 latency and
+throughput per benchmark to benchmarks/results/<time>-<commit>.json.
+"""
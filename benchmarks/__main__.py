@@ -0,0 +1,106 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUITES = ("scoring", "evaluator", "extraction", "store", "endpoints")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark HireIntelIQ hot paths.")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"comma-separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--questions", type=int_list, default=[5, 20, 100], help="interview sizes")
+    parser.add_argument("--candidates", type=int_list, default=[100, 1000, 10000], help="result store sizes")
+    parser.add_argument("--pages", type=int_list, default=[2, 20, 100], help="PDF/DOCX page counts")
+    parser.add_argument("--iterations", type=int, default=20, help="timed calls per benchmark")
+    parser.add_argument("--quick", action="store_true", help="small sizes and 5 iterations, for a smoke run")
+    parser.add_argument("--real-model", action="store_true",
+                        help="use the real SentenceTransformer instead of the stub encoder")
+    parser.add_argument("--encoder-latency", type=float, default=0.0,
+                        help="seconds the stub encoder spends per text")
+    parser.add_argument("--gemini-latency", type=float, default=0.0,
+                        help="seconds the stub Gemini client spends per call")
+    parser.add_argument("--output", help="results JSON (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--keep-workdir", action="store_true", help="do not delete the scratch directory")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.questions, args.candidates, args.pages, args.iterations = [5, 20], [100, 1000], [2, 20], 5
+    args.suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Every module keeps its state under ./data and ./uploads, so run in a
+    # scratch directory; the repo must stay importable after the chdir.
+    sys.path.insert(0, REPO_ROOT)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix="hireiq-bench-")
+    os.environ.setdefault("HR_EMAIL", "hr@example.com")
+    os.environ.setdefault("MAIL_DIGEST_INTERVAL", "86400")  # queue, never send, during the run
+    os.chdir(workdir)
+
+    from benchmarks import suites
+    from benchmarks.harness import Report, compare
+    from benchmarks.stubs import StubEncoder, StubGeminiClient
+    import model_registry
+    from scorer import MODEL_NAME
+
+    if args.real_model:
+        model_registry.get_model(MODEL_NAME)
+        encoder = "real"
+    else:
+        model_registry.register(MODEL_NAME, StubEncoder(seconds_per_text=args.encoder_latency))
+        encoder = "stub"
+    gemini = StubGeminiClient(latency=args.gemini_latency)
+
+    report = Report({
+        "encoder": encoder,
+        "encoder_latency": args.encoder_latency,
+        "gemini_latency": args.gemini_latency,
+        "iterations": args.iterations,
+    })
+    print(f"Benchmarking in {workdir} (encoder: {encoder}, commit: {report.meta['commit']})")
+    try:
+        if "scoring" in args.suites:
+            suites.bench_scoring(report, args.questions, args.iterations)
+        if "evaluator" in args.suites:
+            suites.bench_evaluator(report, args.questions, args.iterations, workdir)
+        if "extraction" in args.suites:
+            suites.bench_extraction(report, args.pages, args.iterations, workdir)
+        if "store" in args.suites:
+            suites.bench_store(report, args.candidates, args.iterations, workdir)
+        if "endpoints" in args.suites:
+            suites.bench_endpoints(report, args.candidates, args.questions, args.iterations, gemini)
+    finally:
+        if output is None:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output = os.path.join(REPO_ROOT, "benchmarks", "results",
+                                  f"{stamp}-{report.meta['commit'] or 'unknown'}.json")
+        print(f"Saved {report.save(output)}")
+        os.chdir(REPO_ROOT)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if baseline:
+        print(f"Compared with {baseline}:")
+        compare(baseline, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import random
+from datetime import datetime, timedelta
+
+from transcript_log import ANSWER, TranscriptLog
+
+POSITIONS = ["Backend Engineer", "Data Scientist", "Frontend Engineer", "DevOps Engineer", "QA Engineer"]
+TOPICS = ["Python", "Flask", "SQL", "caching", "testing", "Docker", "REST APIs", "concurrency",
+          "profiling", "data pipelines", "machine learning", "code review", "monitoring"]
+CATEGORIES = ["Technical Knowledge", "Communication Skills", "Problem Solving", "Relevant Experience",
+              "Cultural Fit"]
+VERBS = ["designed", "optimized", "debugged", "migrated", "scaled", "documented", "automated"]
+FILLER = ("The team shipped the change behind a feature flag, measured latency before and after, "
+          "and rolled it out gradually while watching error rates and user feedback.")
+
+
+def make_qa_pairs(n, seed=0):
+    """n question/answer pairs; answers reuse some of the question's words, like real ones."""
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(n):
+        topic = rng.choice(TOPICS)
+        question = f"Describe a time you {rng.choice(VERBS)} a system using {topic}. What trade-offs did you make?"
+        answer = (f"I {rng.choice(VERBS)} our {topic} service when traffic grew {rng.randint(2, 20)}x. "
+                  f"I chose {rng.choice(TOPICS)} over {rng.choice(TOPICS)} because of cost. {FILLER}")
+        pairs.append({"question": question, "answer": answer})
+    return pairs
+
+
+def make_result(i, seed=0, qa_count=5):
+    """One stored interview result, shaped like /submit-interview's."""
+    rng = random.Random(seed * 1000003 + i)
+    score = rng.random()
+    return {
+        "id": f"bench_{seed}_{i:07d}",
+        "name": f"Candidate {i}",
+        "email": f"candidate{i}@example.com",
+        "position": rng.choice(POSITIONS),
+        "score": round(score, 3),
+        "timestamp": (datetime(2025, 1, 1) + timedelta(minutes=i)).isoformat(),
+        "qa_pairs": make_qa_pairs(qa_count, seed=i),
+        "categories": [{"name": name, "score": round(min(1.0, max(0.0, score + rng.uniform(-0.15, 0.15))) * 100, 1)}
+                       for name in CATEGORIES],
+    }
+
+
+def make_results(n, seed=0, qa_count=5):
+    return [make_result(i, seed, qa_count) for i in range(n)]
+
+
+def fill_store(store, n, seed=0, qa_count=5):
+    """Replace the store's contents with n synthetic results."""
+    store.clear()
+    for result in make_results(n, seed, qa_count):
+        store.insert(result)
+    return store
+
+
+def write_transcript(path, qa_pairs, session_id="bench"):
+    """Write qa_pairs as a transcript.jsonl log."""
+    log = TranscriptLog(path)
+    for i, pair in enumerate(qa_pairs):
+        log.append(ANSWER, session_id=session_id, question_id=f"q{i + 1}",
+                   question=pair["question"], answer=pair["answer"])
+    return path
+
+
+def _page_lines(page, lines_per_page, seed):
+    rng = random.Random(seed * 7919 + page)
+    return [f"Page {page + 1} line {i + 1}: {rng.choice(VERBS)} {rng.choice(TOPICS)} "
+            f"for {rng.randint(1, 9)} years at company {rng.randint(100, 999)}."
+            for i in range(lines_per_page)]
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages, lines_per_page=40, seed=0):
+    """
+    Write a text PDF with `pages` pages that PyPDF2 can extract.
+    Hand-rolled (one Helvetica font, one content stream per page) so no PDF
+    writer needs to be installed.
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for page in range(pages):
+        page_id, content_id = 4 + 2 * page, 5 + 2 * page
+        body = "BT /F1 10 Tf 14 TL 40 760 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in _page_lines(page, lines_per_page, seed)) + " ET"
+        body = body.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(body), body)
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+    xref_at = len(out)
+    count = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % count
+    for obj_id in range(1, count):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_at)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def write_docx(path, pages, lines_per_page=40, seed=0):
+    """Write a DOCX with the same text as write_pdf, one paragraph per line."""
+    from docx import Document
+
+    document = Document()
+    for page in range(pages):
+        for line in _page_lines(page, lines_per_page, seed):
+            document.add_paragraph(line)
+    document.save(path)
+    return path
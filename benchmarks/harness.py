@@ -0,0 +1,120 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def measure(fn, iterations=20, warmup=2, setup=None, items=1):
+    """
+    Time `iterations` calls of fn() after `warmup` untimed ones. setup(), if
+    given, runs untimed before every call (e.g. to clear a cache for cold runs).
+    `items` is how many units of work one call does, for items_per_sec.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, items)
+
+
+def summarize(samples, items=1):
+    seconds = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000.0
+    total = float(seconds.sum())
+    return {
+        "iterations": len(samples),
+        "total_s": round(total, 6),
+        "mean_ms": round(float(seconds.mean()) * 1000.0, 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "min_ms": round(float(seconds.min()) * 1000.0, 4),
+        "max_ms": round(float(seconds.max()) * 1000.0, 4),
+        "ops_per_sec": round(len(samples) / total, 3) if total else None,
+        "items_per_sec": round(len(samples) * items / total, 3) if total else None,
+    }
+
+
+def environment():
+    """Enough context to tell two result files apart: commit, interpreter, machine."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+class Report:
+    """Benchmark results keyed by "<group>:<name>[params]", saved as one JSON document."""
+
+    def __init__(self, meta=None):
+        self.meta = dict(environment(), **(meta or {}))
+        self.results = []
+
+    def add(self, group, name, params, stats):
+        entry = {"group": group, "name": name, "params": params, **stats}
+        self.results.append(entry)
+        print(f"  {key(entry):<60} p50 {stats['p50_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms  "
+              f"p99 {stats['p99_ms']:>10.3f} ms  {stats['ops_per_sec'] or 0:>10.1f} ops/s", flush=True)
+
+    def skip(self, group, name, reason):
+        self.results.append({"group": group, "name": name, "params": {}, "skipped": reason})
+        print(f"  {group}:{name:<52} skipped: {reason}", flush=True)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": self.meta, "results": self.results}, f, indent=2)
+        return path
+
+
+def key(entry):
+    params = ",".join(f"{k}={v}" for k, v in sorted(entry.get("params", {}).items()))
+    return f"{entry['group']}:{entry['name']}[{params}]"
+
+
+def compare(baseline_path, current, metric="p50_ms", threshold=0.10):
+    """
+    Compare `current` (a Report or saved results path) with a baseline file.
+    Returns [(key, baseline, current, ratio), ...] for every benchmark in both,
+    slowest-relative first; ratios above 1 + threshold are flagged when printed.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {key(e): e for e in json.load(f)["results"] if metric in e}
+    if isinstance(current, Report):
+        results = current.results
+    else:
+        with open(current, "r", encoding="utf-8") as f:
+            results = json.load(f)["results"]
+    rows = []
+    for entry in results:
+        old = baseline.get(key(entry))
+        if old is None or metric not in entry or not old[metric]:
+            continue
+        rows.append((key(entry), old[metric], entry[metric], entry[metric] / old[metric]))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    for name, old, new, ratio in rows:
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {name:<60} {old:>10.3f} -> {new:>10.3f} {metric}  x{ratio:.2f}{flag}")
+    return rows
@@ -0,0 +1,57 @@
+import time
+import types
+import zlib
+
+import numpy as np
+
+STUB_DIM = 384  # all-MiniLM-L6-v2's embedding size
+
+
+class StubEncoder:
+    """
+    Stands in for SentenceTransformer: deterministic hashed bag-of-words
+    vectors, so scores are stable and similar texts still score higher.
+    `seconds_per_text` adds a fixed cost per encoded text.
+    """
+
+    def __init__(self, dim=STUB_DIM, seconds_per_text=0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False, batch_size=32, **kwargs):
+        self.calls += 1
+        self.texts += len(texts)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms == 0, 1.0, norms)
+        return out
+
+
+class StubGeminiClient:
+    """
+    Stands in for google.genai.Client: `client.models.generate_content(model, contents)`
+    returns a numbered question list after `latency` seconds.
+    """
+
+    def __init__(self, latency=0.0, questions=6):
+        self.calls = 0
+        self.models = types.SimpleNamespace(generate_content=self._generate_content)
+        self.latency = latency
+        self.questions = questions
+
+    def _generate_content(self, model, contents):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        seed = zlib.crc32(contents.encode("utf-8"))
+        lines = [f"{i + 1}. Question {seed % 997}-{i}: how have you used Python and Flask in production?"
+                 for i in range(self.questions)]
+        return types.SimpleNamespace(text="\n".join(lines))
@@ -0,0 +1,158 @@
+import io
+import itertools
+import os
+
+from benchmarks.generators import (POSITIONS, fill_store, make_qa_pairs, make_result, write_docx, write_pdf,
+                                   write_transcript)
+from benchmarks.harness import measure
+
+
+def bench_scoring(report, question_counts, iterations):
+    from embedding_cache import get_cache
+    from scorer import evaluate_qa_pairs
+
+    cache = get_cache()
+    for n in question_counts:
+        pairs = make_qa_pairs(n, seed=n)
+        params = {"questions": n}
+        report.add("function", "scorer.evaluate_qa_pairs", dict(params, cache="cold"),
+                   measure(lambda: evaluate_qa_pairs(pairs), iterations, setup=cache.clear, items=n))
+        report.add("function", "scorer.evaluate_qa_pairs", dict(params, cache="warm"),
+                   measure(lambda: evaluate_qa_pairs(pairs), iterations, items=n))
+
+
+def bench_evaluator(report, question_counts, iterations, workdir):
+    try:
+        from evaluator import evaluate_transcript
+    except ImportError as e:
+        report.skip("function", "evaluator.evaluate_transcript", f"import failed: {e}")
+        return
+    from embedding_cache import get_cache
+
+    cache = get_cache()
+    for n in question_counts:
+        path = os.path.join(workdir, f"transcript_{n}.jsonl")
+        if not os.path.exists(path):
+            write_transcript(path, make_qa_pairs(n, seed=n))
+        params = {"questions": n}
+        report.add("function", "evaluator.evaluate_transcript", dict(params, cache="cold"),
+                   measure(lambda: evaluate_transcript(path), iterations, setup=cache.clear, items=n))
+        report.add("function", "evaluator.evaluate_transcript", dict(params, cache="warm"),
+                   measure(lambda: evaluate_transcript(path), iterations, items=n))
+
+
+def bench_extraction(report, page_counts, iterations, workdir):
+    from extraction import Extractor
+    from main import extract_text
+
+    # No text cache: every call parses (in the extractor's process pool)
+    uncached = Extractor(cache_dir=None)
+    try:
+        for pages in page_counts:
+            files = {
+                "pdf": write_pdf(os.path.join(workdir, f"resume_{pages}.pdf"), pages, seed=pages),
+                "docx": write_docx(os.path.join(workdir, f"resume_{pages}.docx"), pages, seed=pages),
+            }
+            for kind, path in files.items():
+                params = {"pages": pages, "format": kind}
+                report.add("function", "extraction.parse", params,
+                           measure(lambda: uncached.extract(path), iterations, items=pages))
+                report.add("function", "main.extract_text", dict(params, cache="warm"),
+                           measure(lambda: extract_text(path), iterations, items=pages))
+    finally:
+        uncached.close()
+
+
+def bench_store(report, candidate_counts, iterations, workdir):
+    from csv_export import DASHBOARD_HEADER, dashboard_row, iter_csv
+    from results_store import ResultsStore
+
+    for n in candidate_counts:
+        store = ResultsStore(db_path=os.path.join(workdir, f"results_{n}.sqlite3"), legacy_json=None)
+        fill_store(store, n)
+        params = {"candidates": n}
+        report.add("function", "ResultsStore.query", dict(params, page=50),
+                   measure(lambda: store.query(limit=50), iterations))
+        report.add("function", "ResultsStore.query", dict(params, page=50, filter="position+min_score"),
+                   measure(lambda: store.query(position=POSITIONS[0], min_score=0.5, limit=50), iterations))
+        report.add("function", "ResultsStore.top_by_score", dict(params, k=10),
+                   measure(lambda: store.top_by_score(None, 10), iterations))
+        report.add("function", "csv_export.iter_csv", params,
+                   measure(lambda: sum(len(chunk) for chunk in iter_csv(
+                       store.iter_filtered(), DASHBOARD_HEADER, dashboard_row)), iterations, items=n))
+        ids = itertools.count(n)
+        report.add("function", "ResultsStore.insert", params,
+                   measure(lambda: store.insert(make_result(next(ids))), iterations))
+
+
+def bench_endpoints(report, candidate_counts, question_counts, iterations, gemini):
+    import app as app_module
+    from jobs import get_job_manager
+    from results_store import get_store
+
+    flask_app = app_module.app
+    flask_app.config["GEMINI_CLIENT_FACTORY"] = lambda: gemini
+    client = flask_app.test_client()
+    store = get_store()
+
+    def check(response, *expected):
+        if response.status_code not in (expected or (200,)):
+            raise RuntimeError(f"{response.request.path} returned {response.status_code}: {response.data[:200]!r}")
+        # Most endpoints report failures as 200 + {"status": "error"}
+        if response.is_json and (response.json or {}).get("status") == "error":
+            raise RuntimeError(f"{response.request.path} failed: {response.json.get('message')}")
+        return response
+
+    for n in candidate_counts:
+        fill_store(store, n)
+        app_module.leaderboard.rebuild()
+        params = {"candidates": n}
+
+        report.add("endpoint", "GET /get-results", params,
+                   measure(lambda: check(client.get("/get-results?limit=50")), iterations))
+        etag = client.get("/get-results?limit=50").headers["ETag"]
+        report.add("endpoint", "GET /get-results (304)", params,
+                   measure(lambda: check(client.get("/get-results?limit=50", headers={"If-None-Match": etag}), 304),
+                           iterations))
+        report.add("endpoint", "GET /top-candidates", params,
+                   measure(lambda: check(client.get("/top-candidates")), iterations))
+        for compress in ("0", "1"):
+            report.add("endpoint", "GET /export-results", dict(params, gzip=compress),
+                       measure(lambda: check(client.get(f"/export-results?gzip={compress}")).get_data(),
+                               iterations, items=n))
+        ids = itertools.count(n)
+        report.add("endpoint", "POST /submit-result", params,
+                   measure(lambda: check(client.post("/submit-result", json=make_result(next(ids)))),
+                           iterations))
+
+    jobs = get_job_manager()
+    for n in question_counts:
+        gemini.questions = n
+        params = {"questions": n}
+
+        def upload():
+            response = check(client.post("/upload", data={
+                "resume": (io.BytesIO(b"Python developer with Flask and SQL experience"), "resume.txt"),
+                "jd": (io.BytesIO(b"Backend engineer: Python, Flask, caching"), "jd.txt"),
+                "fresh": "1",  # measure the Gemini round-trip, not the prompt cache
+            }), 202)
+            job = jobs.wait(response.json["job_id"], timeout=60, poll_interval=0.002)
+            if job["status"] != "done":
+                raise RuntimeError(f"question generation failed: {job.get('error')}")
+            return response.json["session_id"], job["result"]["question_ids"]
+
+        report.add("endpoint", "POST /upload + question job", params, measure(upload, iterations))
+
+        # The pipeline caps how many questions it keeps, so answer the ones it returned
+        session_id, ids = upload()
+        headers = {"X-Session-Id": session_id}
+        pairs = make_qa_pairs(n, seed=n)
+        question_ids = itertools.cycle(ids)
+        answers = itertools.cycle(pair["answer"] for pair in pairs)
+        report.add("endpoint", "POST /save-transcript", params,
+                   measure(lambda: check(client.post("/save-transcript", headers=headers, json={
+                       "question_id": next(question_ids), "answer": next(answers)})), iterations))
+
+        payload = {"name": "Bench", "email": "bench@example.com", "position": POSITIONS[0], "qaPairs": pairs}
+        report.add("endpoint", "POST /submit-interview", params,
+                   measure(lambda: check(client.post("/submit-interview", json=payload)), iterations, items=n))
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+import extraction
+from extraction import SUPPORTED_EXTENSIONS, ExtractionError, file_extension, store_stream
+from metrics import span
+
+# Bulk screening: many resumes against one JD. Resumes are parsed in the
+# extractor's process pool, embedded in one batch, ranked against the JD,
+# and only the best TOP_N get Gemini-generated question sets.
+UPLOAD_DIR = "uploads"
+MAX_FILES = int(os.getenv("BULK_MAX_FILES", "1000"))
+MAX_TOTAL_BYTES = int(os.getenv("BULK_MAX_BYTES", str(512 * 1024 * 1024)))  # extracted size of one batch
+TOP_N = int(os.getenv("BULK_TOP_N", "20"))
+GEMINI_CONCURRENCY = int(os.getenv("BULK_GEMINI_CONCURRENCY", "4"))
+PROGRESS_INTERVAL = 0.5  # seconds between progress updates within a stage
+
+
+def _wanted(name):
+    base = os.path.basename(name)
+    return (bool(base) and not base.startswith(".") and "__MACOSX" not in name
+            and file_extension(base) in SUPPORTED_EXTENSIONS)
+
+
+def collect_resumes(source, upload_dir=UPLOAD_DIR, max_files=MAX_FILES, max_bytes=extraction.MAX_FILE_BYTES,
+                    max_total_bytes=MAX_TOTAL_BYTES):
+    """
+    Store every resume in `source` (a directory, or a zip archive as a path or
+    file object) under its content hash. Returns (resumes, skipped): resumes is
+    [{"filename", "path", "digest"}] with duplicate files kept once, skipped is
+    [{"filename", "error"}] for files that were too large. Sizes are checked
+    against the bytes actually read, not just the size a zip entry declares.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    resumes, skipped, seen = [], [], set()
+    total = 0
+
+    def add(name, size, opener):
+        nonlocal total
+        if size > max_bytes:
+            skipped.append({"filename": name, "error": f"{size} bytes; the limit is {max_bytes}"})
+            return
+        if len(resumes) >= max_files:
+            raise ValueError(f"More than {max_files} resumes in one batch")
+        try:
+            with opener() as stream:
+                path, digest = store_stream(stream, name, upload_dir, max_bytes)
+        except ExtractionError as e:
+            skipped.append({"filename": name, "error": str(e)})
+            return
+        total += os.path.getsize(path)
+        if total > max_total_bytes:
+            raise ValueError(f"Resumes in one batch add up to more than {max_total_bytes} bytes")
+        if digest not in seen:
+            seen.add(digest)
+            resumes.append({"filename": name, "path": path, "digest": digest})
+
+    if isinstance(source, str) and os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if _wanted(path):
+                    add(name, os.path.getsize(path), lambda path=path: open(path, "rb"))
+        return resumes, skipped
+
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise ValueError("Resumes must be a zip archive or a directory")
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not _wanted(info.filename):
+                continue
+            # Member names are never used as paths; files are stored by content hash
+            add(os.path.basename(info.filename), info.file_size, lambda info=info: archive.open(info))
+    return resumes, skipped
+
+
+class _Progress:
+    """Throttles progress(dict) callbacks; jobs persist every update to SQLite."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._last = 0.0
+
+    def __call__(self, stage, done, total):
+        now = time.monotonic()
+        if self.fn and (done in (0, total) or now - self._last >= PROGRESS_INTERVAL):
+            self._last = now
+            self.fn({"stage": stage, "done": done, "total": total})
+
+
+def extract_all(resumes, report):
+    """
+    Text for every resume, fanned out so the extractor's process pool parses
+    several PDFs/DOCXs at once. Returns (texts by digest, skipped).
+    """
+    texts, skipped = {}, []
+    workers = extraction.get_extractor().processes
+    report("extract", 0, len(resumes))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-extract") as pool:
+        futures = {pool.submit(extraction.extract_text, r["path"], r["digest"]): r for r in resumes}
+        for done, future in enumerate(as_completed(futures), 1):
+            resume = futures[future]
+            try:
+                text = future.result()
+                if text.strip():
+                    texts[resume["digest"]] = text
+                else:
+                    skipped.append({"filename": resume["filename"], "error": "No text found"})
+            except Exception as e:
+                skipped.append({"filename": resume["filename"], "error": str(e)})
+            report("extract", done, len(resumes))
+    return texts, skipped
+
+
+def screening_result(resume, score, rank, questions, jd_id, position, error=None):
+    """A results-store document for one shortlisted resume, before any interview."""
+    result = {
+        "id": f"screen_{jd_id}_{resume['digest'][:16]}",
+        "type": "screening",
+        "name": os.path.splitext(resume["filename"])[0],
+        "email": "",
+        "position": position,
+        # Resume-to-JD cosine similarity, on the 0-1 scale interview scores use
+        "score": round(min(1.0, max(0.0, score)), 3),
+        "timestamp": datetime.now().isoformat(),
+        "qa_pairs": [],
+        "categories": [],
+        "questions": questions,
+        "rank": rank,
+        "jd_id": jd_id,
+        "resume_id": resume["digest"],
+        "filename": resume["filename"],
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def screen(resumes, jd_text=None, jd_id=None, top_n=TOP_N, position=None, client_factory=None, use_cache=True,
+           concurrency=GEMINI_CONCURRENCY, skipped=(), progress=None):
+    """
+    Rank `resumes` (from collect_resumes) against one JD, registered by text
+    or referenced by jd_id, and generate question sets for the best top_n
+    with at most `concurrency` Gemini calls in flight. The shortlist is saved
+    to the results store and every resume is added to the search index.
+    Returns a JSON-friendly summary.
+    """
+    from jd_registry import get_jd_registry
+    from main import generate_questions, init_gemini
+    from results_store import get_store
+    from scorer import embed_texts
+    from search_index import get_search_index, top_k
+
+    report = _Progress(progress)
+    registry = get_jd_registry()
+    record = registry.get(jd_id) if jd_id else registry.create(jd_text or "")
+    if record is None:
+        raise ValueError(f"Unknown job description id: {jd_id}")
+    jd_id = record["id"]
+    position = position or record.get("title") or ""
+
+    texts, failed = extract_all(resumes, report)
+    skipped = list(skipped) + failed
+    parsed = [r for r in resumes if r["digest"] in texts]
+
+    # One batched encode for the whole batch (cached texts are skipped)
+    report("rank", 0, len(parsed))
+    with span("bulk.embed"):
+        embeddings = embed_texts([texts[r["digest"]] for r in parsed]) if parsed else np.zeros((0, 0))
+    scores = embeddings @ registry.get_embedding(jd_id) if parsed else np.zeros(0)
+    order = top_k(scores, len(scores))
+    if parsed:
+        get_search_index().add_many(
+            [{"id": r["digest"], "text": texts[r["digest"]], "filename": r["filename"], "jd_id": jd_id}
+             for r in parsed],
+            embeddings,
+        )
+    report("rank", len(parsed), len(parsed))
+
+    shortlist = [(rank, parsed[i], float(scores[i])) for rank, i in enumerate(order[:max(0, top_n)], 1)]
+    questions, errors = {}, {}
+    report("questions", 0, len(shortlist))
+    if shortlist:
+        client = client_factory() if client_factory else init_gemini()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bulk-gemini") as pool:
+            futures = {pool.submit(generate_questions, client, texts[resume["digest"]], record["text"],
+                                   use_cache=use_cache): resume["digest"]
+                       for _, resume, _ in shortlist}
+            for done, future in enumerate(as_completed(futures), 1):
+                digest = futures[future]
+                try:
+                    questions[digest] = future.result()
+                except Exception as e:
+                    print(f"Error generating questions for {digest}: {e}")
+                    errors[digest] = str(e)
+                report("questions", done, len(shortlist))
+
+    store = get_store()
+    saved = []
+    for rank, resume, score in shortlist:
+        result = screening_result(resume, score, rank, questions.get(resume["digest"], []), jd_id, position,
+                                  errors.get(resume["digest"]))
+        store.insert(result)
+        saved.append({"result_id": result["id"], "rank": rank, "filename": resume["filename"],
+                      "score": result["score"], "questions": len(result["questions"]),
+                      **({"error": result["error"]} if "error" in result else {})})
+
+    return {
+        "jd_id": jd_id,
+        "position": position,
+        "total": len(resumes),
+        "ranked": [{"rank": rank, "resume_id": parsed[i]["digest"], "filename": parsed[i]["filename"],
+                    "score": round(float(scores[i]), 4)} for rank, i in enumerate(order, 1)],
+        "shortlist": saved,
+        "skipped": skipped,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python bulk_screening.py",
+                                     description="Screen a zip or directory of resumes against one JD.")
+    parser.add_argument("resumes", help="zip archive or directory of .pdf/.docx/.txt resumes")
+    jd = parser.add_mutually_exclusive_group(required=True)
+    jd.add_argument("--jd", help="job description file")
+    jd.add_argument("--jd-id", help="id of a JD registered through /jds")
+    parser.add_argument("--position", help="position name for the results (default: the JD's title)")
+    parser.add_argument("--top-n", type=int, default=TOP_N, help="resumes that get a question set")
+    parser.add_argument("--concurrency", type=int, default=GEMINI_CONCURRENCY, help="Gemini calls in flight")
+    parser.add_argument("--fresh", action="store_true", help="skip the prompt cache")
+    parser.add_argument("--output", help="write the JSON summary here instead of stdout")
+    args = parser.parse_args(argv)
+
+    resumes, skipped = collect_resumes(args.resumes)
+    jd_text = extraction.extract_text(args.jd) if args.jd else None
+    summary = screen(resumes, jd_text=jd_text, jd_id=args.jd_id, top_n=args.top_n, position=args.position,
+                     use_cache=not args.fresh, concurrency=args.concurrency, skipped=skipped,
+                     progress=lambda info: print(f"{info['stage']}: {info['done']}/{info['total']}",
+                                                 file=sys.stderr))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import os
+import io
+import csv
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+from metrics import BYTES_WRITTEN
+
+# Dashboard export (/export-results)
+DASHBOARD_HEADER = [
+    'Name', 'Email', 'Position', 'Overall Score (%)', 'Interview Date',
+    'Technical Knowledge (%)', 'Communication Skills (%)', 'Problem Solving (%)',
+    'Relevant Experience (%)', 'Cultural Fit (%)'
+]
+
+# HR attachment (data/hr_results.csv)
+HR_CSV_PATH = os.path.join('data', 'hr_results.csv')
+HR_HEADER = ['ID', 'Name', 'Email', 'Position', 'Score', 'Timestamp']
+
+
+def dashboard_row(result):
+    # /submit-result stores any JSON, so a missing or malformed field becomes
+    # an empty cell rather than an exception halfway through a streamed export
+    try:
+        date = datetime.fromisoformat(result.get('timestamp') or '').strftime('%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        date = ''
+    try:
+        score = round(float(result.get('score')) * 100, 1)
+    except (TypeError, ValueError):
+        score = ''
+    categories = {cat.get('name'): cat.get('score')
+                  for cat in result.get('categories') or [] if isinstance(cat, dict)}
+    return [
+        result.get('name', ''),
+        result.get('email', ''),
+        result.get('position', ''),
+        score,
+        date,
+        categories.get('Technical Knowledge', ''),
+        categories.get('Communication Skills', ''),
+        categories.get('Problem Solving', ''),
+        categories.get('Relevant Experience', ''),
+        categories.get('Cultural Fit', '')
+    ]
+
+
+def hr_row(r):
+    return [
+        r.get('id'), r.get('name'), r.get('email'),
+        r.get('position'), r.get('score'), r.get('timestamp')
+    ]
+
+
+def iter_csv(results, header, row_fn, flush_rows=100):
+    """
+    Yield CSV text in small pieces as results are read, so an export never
+    holds more than `flush_rows` rows in memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    pending = 0
+    for result in results:
+        writer.writerow(row_fn(result))
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_encoded(chunks, compress=False):
+    """UTF-8 encode streamed CSV text, optionally as a gzip stream."""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    gzipper = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = gzipper.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield gzipper.flush()
+
+
+@contextmanager
+def _csv_lock(filename):
+    """Serialize appends and rebuilds of one CSV across workers."""
+    with open(filename + '.lock', 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def export_results_to_csv(results, filename=HR_CSV_PATH, store=None):
+    """
+    Keep the HR CSV up to date incrementally: `results` are appended as new rows.
+    If the file does not exist yet it is written once from the whole results
+    store (streamed), which already includes the new results.
+    """
+    with _csv_lock(filename):
+        if os.path.exists(filename) or store is None:
+            write_header = not os.path.exists(filename)
+            with open(filename, mode='a', newline='', encoding='utf-8') as csvfile:
+                chunks = iter_csv(results, HR_HEADER if write_header else None, hr_row)
+                written = sum(csvfile.write(chunk) for chunk in chunks)
+            BYTES_WRITTEN.inc(written, kind="csv")
+            return filename
+        return _rebuild(store, filename)
+
+
+def rebuild_results_csv(store, filename=HR_CSV_PATH):
+    """
+    Rewrite the HR CSV from the store after results were deleted, so removed
+    candidates are not mailed to HR again. Does nothing if it was never written.
+    """
+    with _csv_lock(filename):
+        if os.path.exists(filename):
+            _rebuild(store, filename)
+
+
+def _rebuild(store, filename):
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, mode='w', newline='', encoding='utf-8') as csvfile:
+        written = sum(csvfile.write(chunk) for chunk in iter_csv(store.iter_filtered(), HR_HEADER, hr_row))
+    os.replace(tmp_path, filename)
+    BYTES_WRITTEN.inc(written, kind="csv")
+    return filename
@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import CACHE_LOOKUPS, span
+
+# Bounded in-memory tier, plus an optional SQLite tier that survives restarts.
+# Set EMBEDDING_CACHE_PATH to an empty string to keep the cache memory-only.
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+DEFAULT_DISK_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("data", "embeddings.sqlite3"))
+
+
+def cache_key(model_name, text, normalize=False):
+    """Content address for one embedding: hash of model name, normalization flag and text."""
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0n" if normalize else b"\0r")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for SentenceTransformer embeddings.
+    Lookups hit the in-memory LRU first, then the disk tier; everything still
+    missing is encoded in one batched call and written back to both tiers.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_path=DEFAULT_DISK_PATH):
+        self.max_entries = max_entries
+        self.disk_path = disk_path or None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_path:
+            os.makedirs(os.path.dirname(self.disk_path) or ".", exist_ok=True)
+            conn = self._conn()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+            conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections are not shareable across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.disk_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        if not self.disk_path or not keys:
+            return {}
+        found = {}
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _store_on_disk(self, items):
+        if not self.disk_path or not items:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+            [(key, int(vec.shape[0]), vec.astype(np.float32).tobytes()) for key, vec in items],
+        )
+        conn.commit()
+
+    def encode(self, model, texts, model_name, normalize_embeddings=False, **encode_kwargs):
+        """
+        Drop-in replacement for model.encode(texts) that only runs the encoder
+        on texts not seen before. Returns a float32 array of shape (len(texts), dim).
+        `model` may also be a zero-argument loader, called only if something misses.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [cache_key(model_name, t, normalize_embeddings) for t in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    vectors[key] = vec
+
+        pending = list(dict.fromkeys(k for k in keys if k not in vectors))
+        from_disk = self._load_from_disk(pending)
+
+        # Encode each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in from_disk and key not in missing:
+                missing[key] = text
+
+        encoded = []
+        if missing:
+            if not hasattr(model, "encode"):
+                model = model()
+            with span("embedding.encode"):
+                out = model.encode(
+                    list(missing.values()),
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize_embeddings,
+                    **encode_kwargs,
+                )
+            encoded = list(zip(missing.keys(), np.asarray(out, dtype=np.float32)))
+            self._store_on_disk(encoded)
+
+        with self._lock:
+            for key, vec in list(from_disk.items()) + encoded:
+                self._remember(key, vec)
+                vectors[key] = vec
+            misses = disk_hits = 0
+            for key in keys:
+                if key in missing:
+                    misses += 1
+                elif key in from_disk:
+                    disk_hits += 1
+            hits = len(keys) - misses - disk_hits
+            self.misses += misses
+            self.disk_hits += disk_hits
+            self.hits += hits
+        for result, count in (("memory", hits), ("disk", disk_hits), ("miss", misses)):
+            if count:
+                CACHE_LOOKUPS.inc(count, cache="embedding", result=result)
+
+        return np.stack([vectors[k] for k in keys])
+
+    def stats(self):
+        """Hit/miss counters; every hit is one encoder input that was not recomputed."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_path": self.disk_path,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.disk_path:
+            conn = self._conn()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache shared by scorer.py and evaluator.py."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = EmbeddingCache()
+    return _default_cache
@@ -1,39 +1,50 @@
 import os
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+from embedding_cache import get_cache
+from model_registry import get_model
+from transcript_log import ANSWER, TranscriptLog
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
 
 
 def get_embeddings(texts):
-    return [np.array(emb) for emb in model.encode(texts)]
+    return [np.array(emb) for emb in get_cache().encode(lambda: get_model(MODEL_NAME), texts, MODEL_NAME)]
 
 
 def evaluate_transcript(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        raw = f.read()
-
-    # Split into Q/A pairs
-    qas = [block.strip() for block in raw.strip().split("\n\n") if block.strip()]
+    if file_path.endswith('.jsonl'):
+        # Structured transcript log: one record per answer, text kept as recorded
+        records = TranscriptLog(file_path).records(ANSWER)
+        qas = [(r['question'].strip(), r.get('answer', '').strip()) for r in records]
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            raw = f.read()
+
+        # Split into Q/A pairs
+        qas = []
+        for block in raw.strip().split("\n\n"):
+            if not block.strip():
+                continue
+            lines = block.strip().split('\n')
+            q = lines[0].replace("Q: ", "").strip()
+            a = lines[1].replace("A: ", "").strip() if len(lines) > 1 else ""
+            qas.append((q, a))
     if not qas:
         raise ValueError("Transcript is empty or malformed.")
 
     total = len(qas)
 
-    # Split into 10 equal chunks
-    chunks = np.array_split(qas, 10)
+    # Split into 10 equal chunks (of pair indices)
+    chunks = np.array_split(np.arange(total), 10)
 
     scores = []
 
     for idx, chunk in enumerate(chunks):
         try:
             texts = []
-            for qa in chunk:
-                lines = qa.split('\n')
-                q = lines[0].replace("Q: ", "").strip()
-                a = lines[1].replace("A: ", "").strip() if len(lines) > 1 else ""
-                texts.extend([q, a])
+            for i in chunk:
+                texts.extend(qas[i])
 
             embeddings = get_embeddings(texts)
             sim_scores = []
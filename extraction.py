@@ -0,0 +1,327 @@
+import os
+import time
+import atexit
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import BYTES_WRITTEN, CACHE_LOOKUPS, span
+
+DEFAULT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", os.path.join("data", "extracted"))
+MAX_FILE_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(16 * 1024 * 1024)))
+TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT", "30"))
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PROCESSES = int(os.getenv("EXTRACT_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+# Bump when the extraction logic changes so stale cached text is not reused
+EXTRACTOR_VERSION = "1"
+
+SUPPORTED_EXTENSIONS = ("txt", "pdf", "docx")
+
+
+class ExtractionError(ValueError):
+    """The file could not be parsed within the size and time limits."""
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_extension(path):
+    return path.lower().rsplit(".", 1)[-1] if "." in path else ""
+
+
+# --- Parsers. These run inside the worker processes. ---
+
+def _pdf_short_text(path, max_pages):
+    """(page count, page texts) in one pass, or (page count, None) for PDFs worth splitting."""
+    import PyPDF2
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        pages = len(reader.pages)
+        if pages >= max_pages:
+            return pages, None
+        return pages, [page.extract_text() or "" for page in reader.pages]
+
+
+def _pdf_pages_text(path, start, stop):
+    import PyPDF2
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _docx_text(path):
+    from docx import Document
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs)
+
+
+def _serve(conn):
+    """Worker process loop: run (fn, args) requests from the pipe until it closes."""
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # The exception itself would not pickle
+                conn.send((False, ExtractionError(repr(e))))
+
+
+class _WorkerLost(Exception):
+    """A parser process missed its deadline (timed_out) or died; it has to be replaced."""
+
+    def __init__(self, timed_out):
+        super().__init__("timed out" if timed_out else "exited")
+        self.timed_out = timed_out
+
+
+class _Worker:
+    """One parser process. A worker that misses its deadline is killed on its own."""
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, fn, args, timeout):
+        """fn(*args) in the worker; raises _WorkerLost if it takes longer than `timeout` or dies."""
+        try:
+            self.conn.send((fn, args))
+            if not self.conn.poll(timeout):
+                raise _WorkerLost(timed_out=True)
+            ok, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise _WorkerLost(timed_out=False)
+        if not ok:
+            raise value
+        return value
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class Extractor:
+    """
+    Extracts text from uploaded résumés and job descriptions.
+    Identical files (by content hash) are parsed once and served from an
+    on-disk text cache afterwards. PDF and DOCX parsing runs in up to
+    `processes` worker processes with a per-file deadline, so a malformed file
+    cannot pin a web worker; only the process parsing that file is killed.
+    Long PDFs are split into page ranges parsed in parallel.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=MAX_FILE_BYTES, timeout=TIMEOUT_SECONDS,
+                 processes=PROCESSES, parallel_min_pages=PARALLEL_MIN_PAGES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.processes = max(1, processes)
+        self.parallel_min_pages = parallel_min_pages
+        # spawn: forking a threaded web worker is not safe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.processes)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _checkout(self, deadline):
+        """An idle worker (started if needed), or None if none frees up before `deadline`."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Workers and their pipes belong to the parent of a fork
+                self._idle = []
+                self._slots = threading.BoundedSemaphore(self.processes)
+                self._pid = os.getpid()
+            slots = self._slots
+        if not slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return None
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            try:
+                worker = _Worker(self._ctx)
+            except Exception:
+                slots.release()
+                raise
+        return worker, slots
+
+    def _call(self, fn, args, deadline):
+        checked_out = self._checkout(deadline)
+        if checked_out is None:
+            raise _WorkerLost(timed_out=True)
+        worker, slots = checked_out
+        try:
+            result = worker.call(fn, args, max(0.0, deadline - time.monotonic()))
+        except _WorkerLost:
+            # Stuck on a malformed file, or died: kill this process only
+            worker.kill()
+            slots.release()
+            raise
+        except Exception:
+            self._checkin(worker, slots)
+            raise
+        self._checkin(worker, slots)
+        return result
+
+    def _checkin(self, worker, slots):
+        with self._lock:
+            if slots is self._slots:
+                self._idle.append(worker)
+                worker = None
+        if worker is not None:
+            worker.kill()
+        slots.release()
+
+    def _run(self, tasks, path):
+        """Run [(fn, args), ...] in worker processes and collect results within the file's deadline."""
+        deadline = time.monotonic() + self.timeout
+        try:
+            if len(tasks) == 1:
+                fn, args = tasks[0]
+                return [self._call(fn, args, deadline)]
+            with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="extract") as threads:
+                futures = [threads.submit(self._call, fn, args, deadline) for fn, args in tasks]
+                return [future.result() for future in futures]
+        except _WorkerLost as e:
+            if e.timed_out:
+                raise ExtractionError(f"Timed out after {self.timeout:g}s extracting {os.path.basename(path)}")
+            raise ExtractionError(f"The parser exited while extracting {os.path.basename(path)}")
+
+    def close(self):
+        """Stop this process's idle workers; busy ones exit when their result is checked in."""
+        with self._lock:
+            idle = self._idle if self._pid == os.getpid() else []
+            self._idle = []
+            self._slots = threading.BoundedSemaphore(self.processes)
+            self._pid = os.getpid()
+        for worker in idle:
+            worker.kill()
+
+    def _parse(self, path, ext):
+        if ext == "txt":
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        if ext == "docx":
+            return self._run([(_docx_text, (path,))], path)[0]
+        if ext == "pdf":
+            # Short PDFs are read in the same pass that counts their pages
+            max_pages = self.parallel_min_pages if self.processes > 1 else float("inf")
+            pages, texts = self._run([(_pdf_short_text, (path, max_pages))], path)[0]
+            if texts is not None:
+                return "".join(texts)
+            step = -(-pages // self.processes)
+            ranges = [(i, min(i + step, pages)) for i in range(0, pages, step)]
+            parts = self._run([(_pdf_pages_text, (path, a, b)) for a, b in ranges], path)
+            # Join once at the end instead of growing a string page by page
+            return "".join(text for part in parts for text in part)
+        raise ValueError("Unsupported file type. Please upload a .txt, .pdf, or .docx")
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.v{EXTRACTOR_VERSION}.txt")
+
+    def extract(self, path, digest=None):
+        """Return the text of `path`, parsing it only if this content was never seen."""
+        ext = file_extension(path)
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise ValueError("Unsupported file type. Please upload a .txt, .pdf, or .docx")
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            raise ExtractionError(f"{os.path.basename(path)} is {size} bytes; the limit is {self.max_bytes}")
+
+        if not self.cache_dir:
+            with span(f"extract_text.{ext}"):
+                return self._parse(path, ext)
+
+        digest = digest or file_digest(path)
+        cache_path = self._cache_path(digest)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                text = f.read()
+            CACHE_LOOKUPS.inc(cache="extracted_text", result="hit")
+            return text
+        except FileNotFoundError:
+            CACHE_LOOKUPS.inc(cache="extracted_text", result="miss")
+
+        with span(f"extract_text.{ext}"):
+            text = self._parse(path, ext)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            written = f.write(text)
+        os.replace(tmp_path, cache_path)
+        BYTES_WRITTEN.inc(written, kind="extracted_text")
+        return text
+
+
+def store_upload(file_storage, upload_dir):
+    """
+    Save an uploaded file under its content hash, so the same JD uploaded for
+    every candidate is stored once. Returns (path, digest).
+    """
+    return store_stream(file_storage.stream, file_storage.filename or "", upload_dir)
+
+
+def store_stream(stream, filename, upload_dir, max_bytes=MAX_FILE_BYTES):
+    """
+    store_upload() for any binary stream (a zip member, an open file) named
+    `filename`. Stops with ExtractionError once more than `max_bytes` were
+    read, whatever size the stream claimed (a zip header can lie).
+    """
+    ext = file_extension(filename)
+    h = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(upload_dir, f".upload.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in iter(lambda: stream.read(min(1024 * 1024, max_bytes + 1 - size)), b""):
+                size += len(block)
+                if size > max_bytes:
+                    raise ExtractionError(f"{os.path.basename(filename)} is larger than {max_bytes} bytes")
+                h.update(block)
+                f.write(block)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    BYTES_WRITTEN.inc(size, kind="upload")
+    digest = h.hexdigest()
+    path = os.path.join(upload_dir, f"{digest}.{ext}")
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return path, digest
+
+
+_default_extractor = None
+_default_lock = threading.Lock()
+
+
+def get_extractor():
+    global _default_extractor
+    if _default_extractor is None:
+        with _default_lock:
+            if _default_extractor is None:
+                _default_extractor = Extractor()
+                atexit.register(_default_extractor.close)
+    return _default_extractor
+
+
+def extract_text(path, digest=None):
+    return get_extractor().extract(path, digest)
@@ -0,0 +1,34 @@
+import os
+
+import metrics
+import model_registry
+from mail_queue import get_mail_queue
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Import the app in the master so the preloaded model is inherited by every worker
+preload_app = True
+
+
+def on_starting(server):
+    # PRELOAD_MODELS is a comma-separated list of model names; set it empty to skip
+    model_registry.preload()
+
+
+def post_fork(server, worker):
+    # No-op when the master already preloaded; otherwise load off the request path
+    model_registry.load_in_background()
+    # Send whatever the outbox still holds from before the restart
+    get_mail_queue()
+
+
+def worker_exit(server, worker):
+    # Write the last few seconds of counters, then fold them into the 'retired' rows
+    metrics.get_registry().retire()
+
+
+def child_exit(server, worker):
+    # Runs in the master, also for workers that were killed before worker_exit
+    metrics.get_registry().retire(worker.pid)
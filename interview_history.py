@@ -0,0 +1,80 @@
+PENDING_ANSWER = "<user_input_required>"
+
+
+class InterviewHistory:
+    """
+    Questions of one interview, indexed by question id.
+    Keeps a pointer to the first unanswered question so "what's next" is O(1)
+    amortized, answers are set by id in O(1), and duplicate question texts
+    get distinct ids instead of colliding. `dirty` holds ids answered since
+    the history was last folded back into its stored document.
+    """
+
+    def __init__(self, items=None):
+        self.items = []
+        self._by_id = {}
+        self._by_text = {}
+        self._next = 0
+        self.dirty = set()
+        for item in items or []:
+            self._append(dict(item))
+
+    def _append(self, item):
+        item.setdefault("id", f"q{len(self.items) + 1}")
+        item.setdefault("answer", PENDING_ANSWER)
+        self._by_id[item["id"]] = len(self.items)
+        self._by_text.setdefault(item["question"].strip(), []).append(item["id"])
+        self.items.append(item)
+
+    @classmethod
+    def from_questions(cls, questions):
+        return cls([{"question": q} for q in questions])
+
+    def __len__(self):
+        return len(self.items)
+
+    def _advance(self):
+        while self._next < len(self.items) and self.items[self._next]["answer"] != PENDING_ANSWER:
+            self._next += 1
+
+    def next_unanswered(self):
+        """The first question still waiting for an answer, or None when done."""
+        self._advance()
+        return self.items[self._next] if self._next < len(self.items) else None
+
+    def get(self, question_id):
+        index = self._by_id.get(question_id)
+        return self.items[index] if index is not None else None
+
+    def index_of(self, question_id):
+        return self._by_id.get(question_id)
+
+    def resolve(self, question_id=None, question=None):
+        """
+        Question id for a save request. Clients should send the id; a bare
+        question text maps to the first unanswered question with that text.
+        """
+        if question_id:
+            return question_id if question_id in self._by_id else None
+        ids = self._by_text.get((question or "").strip(), [])
+        for qid in ids:
+            if self.items[self._by_id[qid]]["answer"] == PENDING_ANSWER:
+                return qid
+        return ids[0] if ids else None
+
+    def set_answer(self, question_id, answer):
+        index = self._by_id.get(question_id)
+        if index is None:
+            raise KeyError(f"Unknown question id: {question_id}")
+        self.items[index]["answer"] = answer
+        self.dirty.add(question_id)
+        if index < self._next:
+            # An earlier question was re-opened or re-answered; re-check from there
+            self._next = index
+        return self.items[index]
+
+    def to_list(self):
+        return [dict(item) for item in self.items]
+
+    def mark_clean(self):
+        self.dirty.clear()
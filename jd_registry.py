@@ -0,0 +1,136 @@
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+DEFAULT_DB_PATH = os.getenv("JD_DB_PATH", os.path.join("data", "jds.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jds (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    source_filename TEXT,
+    content_hash TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    embedding BLOB,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jds_created_at ON jds (created_at);
+"""
+
+
+def text_hash(text):
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class JDRegistry:
+    """
+    Job descriptions parsed, hashed and embedded once per role.
+    Candidates then reference a JD by id instead of uploading the file again.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, embed_fn=None):
+        self.db_path = db_path
+        # embed_fn(list_of_texts) -> (n, dim) array; defaults to scorer.embed_texts
+        self.embed_fn = embed_fn
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _embed(self, text):
+        embed_fn = self.embed_fn
+        if embed_fn is None:
+            from scorer import embed_texts
+            embed_fn = embed_texts
+        return np.asarray(embed_fn([text])[0], dtype=np.float32)
+
+    def create(self, text, title=None, source_filename=None):
+        """
+        Register a JD and return its record. Registering the same text twice
+        returns the existing record instead of storing a duplicate.
+        """
+        if not text or not text.strip():
+            raise ValueError("Job description text is empty")
+        digest = text_hash(text)
+        existing = self.get_by_hash(digest)
+        if existing is not None:
+            return existing
+
+        embedding = self._embed(text)
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "title": title or (source_filename or "Untitled role"),
+            "source_filename": source_filename,
+            "content_hash": digest,
+            "text": text,
+            "created_at": time.time(),
+        }
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jds (id, title, source_filename, content_hash, text, embedding, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record["id"], record["title"], source_filename, digest, text,
+                 embedding.tobytes(), record["created_at"]),
+            )
+        # Another worker may have registered the same text first
+        return self.get_by_hash(digest)
+
+    def _record(self, row, include_text=True):
+        if row is None:
+            return None
+        record = {k: row[k] for k in row.keys() if k != "embedding"}
+        if not include_text:
+            record.pop("text", None)
+        return record
+
+    def get(self, jd_id, include_text=True):
+        row = self._conn().execute("SELECT * FROM jds WHERE id = ?", (jd_id,)).fetchone()
+        return self._record(row, include_text)
+
+    def get_by_hash(self, digest):
+        row = self._conn().execute("SELECT * FROM jds WHERE content_hash = ?", (digest,)).fetchone()
+        return self._record(row)
+
+    def get_embedding(self, jd_id):
+        row = self._conn().execute("SELECT embedding FROM jds WHERE id = ?", (jd_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def list(self, limit=100):
+        rows = self._conn().execute(
+            "SELECT id, title, source_filename, content_hash, created_at FROM jds"
+            " ORDER BY created_at DESC LIMIT ?",
+            (int(limit),),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_jd_registry():
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = JDRegistry()
+    return _default_registry
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import span
+
+DEFAULT_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+DEFAULT_MAX_INFLIGHT = int(os.getenv("JOBS_MAX_INFLIGHT", "4"))
+DEFAULT_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "32"))
+# An SSE stream holds a whole sync gunicorn worker, so streams end well inside
+# the worker timeout; EventSource reconnects on its own and gets the current state.
+EVENTS_TIMEOUT = float(os.getenv("JOBS_EVENTS_TIMEOUT", "25"))
+# Each process refreshes heartbeat_at on its unfinished jobs; a job whose
+# heartbeat is older than JOBS_STALE_SECONDS lost its process (crash, timeout
+# kill, redeploy) and is marked as failed.
+HEARTBEAT_INTERVAL = 10.0
+STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "60"))
+
+TERMINAL_STATES = ("done", "error")
+LOST_JOB_ERROR = "The worker running this job exited before it finished"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobManager:
+    """
+    Runs slow work (Gemini calls, bulk screening) on a bounded thread pool.
+    Job state lives in SQLite so whichever gunicorn worker receives the poll
+    can answer it, not just the one that accepted the job.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_inflight=DEFAULT_MAX_INFLIGHT,
+                 max_queued=DEFAULT_MAX_QUEUED):
+        self.db_path = db_path
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+        self._executor = None
+        self._executor_pid = None
+        self._owner = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # another worker added it first
+        conn.commit()
+        self.reap()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _pool(self):
+        # Executor threads do not survive a fork, so each process gets its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="job")
+            self._executor_pid = os.getpid()
+            self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self._pending = 0
+            threading.Thread(target=self._heartbeat_loop, args=(self._owner,),
+                             name="job-heartbeat", daemon=True).start()
+        return self._executor
+
+    def _heartbeat_loop(self, owner):
+        while self._owner == owner:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self._lock:
+                if not self._pending:
+                    continue
+            try:
+                conn = self._conn()
+                with conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                        (time.time(), owner),
+                    )
+            except Exception as e:
+                print(f"Error updating job heartbeats: {e}")
+
+    def reap(self, job_id=None):
+        """
+        Mark unfinished jobs whose process stopped heartbeating as failed (one
+        job, or all of them). Only writes when there is something to settle.
+        """
+        stale = "status IN ('queued', 'running') AND COALESCE(heartbeat_at, updated_at) < ?"
+        params = [time.time() - STALE_SECONDS]
+        if job_id is not None:
+            stale += " AND id = ?"
+            params.append(job_id)
+        conn = self._conn()
+        if conn.execute(f"SELECT 1 FROM jobs WHERE {stale} LIMIT 1", params).fetchone() is None:
+            return 0
+        with conn:
+            return conn.execute(
+                f"UPDATE jobs SET status = 'error', error = ?, updated_at = ? WHERE {stale}",
+                [LOST_JOB_ERROR, time.time()] + params,
+            ).rowcount
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        conn = self._conn()
+        with conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def queue_depth(self):
+        """Jobs accepted by this process that have not finished yet."""
+        with self._lock:
+            return self._pending
+
+    def counts(self):
+        """Unfinished jobs by status, across every process sharing the database."""
+        self.reap()
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE status IN ('queued', 'running') GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return a job id immediately.
+        If fn accepts a `progress` keyword it is given a callback to report progress.
+        Raises QueueFullError when this process already has max_queued jobs pending.
+        """
+        with self._lock:
+            pool = self._pool()
+            if self._pending >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} pending)")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, status, created_at, updated_at, owner, heartbeat_at)"
+                    " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, kind, now, now, self._owner, now),
+                )
+            pool.submit(self._run, job_id, kind, fn, args, kwargs)
+        except Exception:
+            # _run never started, so its slot has to be given back here
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id, kind, fn, args, kwargs):
+        try:
+            self._update(job_id, status="running")
+            if kwargs.pop("_with_progress", False):
+                kwargs["progress"] = lambda info: self._update(job_id, progress=json.dumps(info))
+            with span(f"job.{kind}"):
+                result = fn(*args, **kwargs)
+            self._update(job_id, status="done", result=json.dumps(result))
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="error", error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def submit_with_progress(self, kind, fn, *args, **kwargs):
+        """Like submit(), but passes fn a `progress(dict)` callback."""
+        return self.submit(kind, fn, *args, _with_progress=True, **kwargs)
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row["status"] not in TERMINAL_STATES and self.reap(job_id):
+            row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        job = dict(row)
+        for key in ("result", "progress"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def wait(self, job_id, timeout=None, poll_interval=0.1):
+        """Block until the job reaches a terminal state (used by the CLI and tests)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def events(self, job_id, poll_interval=0.5, timeout=None):
+        """
+        Yield Server-Sent Events for a job: one event whenever its state changes,
+        ending after the terminal state or after `timeout` seconds
+        (EVENTS_TIMEOUT by default), when the client is expected to reconnect.
+        """
+        last = None
+        deadline = time.monotonic() + (EVENTS_TIMEOUT if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            job = self.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"message\": \"Job not found\"}\n\n"
+                return
+            snapshot = (job["status"], job["updated_at"])
+            if snapshot != last:
+                last = snapshot
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in TERMINAL_STATES:
+                return
+            time.sleep(poll_interval)
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_job_manager():
+    global _default_manager
+    if _default_manager is None:
+        with _default_lock:
+            if _default_manager is None:
+                _default_manager = JobManager()
+    return _default_manager
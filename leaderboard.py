@@ -0,0 +1,172 @@
+import os
+import heapq
+import threading
+
+DEFAULT_K = int(os.getenv("LEADERBOARD_SIZE", "10"))
+
+
+def _entry(result):
+    score = float(result["score"])
+    return {
+        "id": result["id"],
+        "name": result.get("name"),
+        "position": result.get("position"),
+        # Same scale top.json has always used
+        "score": round(score * 100, 1),
+        "timestamp": result.get("timestamp"),
+        "_key": (score, result.get("timestamp") or "", str(result["id"])),
+    }
+
+
+class TopK:
+    """
+    Bounded min-heap holding the K best entries, with an id -> heap slot index
+    so arbitrary entries can be removed in O(log K) as well.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []   # [(key, id)]
+        self._entries = {}
+        self._slots = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, result_id):
+        return result_id in self._entries
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._slots[heap[i][1]] = i
+        self._slots[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._heap[i][0] >= self._heap[parent][0]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self._heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._heap[child][0] < self._heap[smallest][0]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+    def push(self, entry):
+        """Offer an entry; returns True if it made it into the top K."""
+        result_id = entry["id"]
+        if result_id in self._entries:
+            self.remove(result_id)
+        key = entry["_key"]
+        if len(self._heap) >= self.k:
+            if key <= self._heap[0][0]:
+                return False
+            self.remove(self._heap[0][1])
+        self._heap.append((key, result_id))
+        self._entries[result_id] = entry
+        self._slots[result_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+        return True
+
+    def remove(self, result_id):
+        """Remove an entry by id; returns True if it was present."""
+        i = self._slots.pop(result_id, None)
+        if i is None:
+            return False
+        del self._entries[result_id]
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._slots[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self._slots[last[1]])
+        return True
+
+    def ranked(self):
+        entries = heapq.nlargest(len(self._heap), self._heap)
+        return [{k: v for k, v in self._entries[rid].items() if k != "_key"} for _, rid in entries]
+
+
+class Leaderboard:
+    """
+    In-memory top-K candidates, overall and per position, kept in step with the
+    results store. Boards are filled lazily from the store's score index and then
+    maintained incrementally; if another worker has written to the store since
+    we last looked, the loaded boards are refilled before serving.
+    """
+
+    def __init__(self, store, k=DEFAULT_K):
+        self.store = store
+        self.k = k
+        self._boards = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _board(self, position):
+        board = self._boards.get(position)
+        if board is None:
+            board = TopK(self.k)
+            for result in self.store.top_by_score(position, self.k):
+                board.push(_entry(result))
+            self._boards[position] = board
+        return board
+
+    def _sync(self):
+        version = self.store.version()
+        if version != self._version:
+            self._boards.clear()
+            self._version = version
+
+    def rebuild(self):
+        """Drop every board; they are refilled from the results store on next use."""
+        with self._lock:
+            self._boards.clear()
+            self._version = self.store.version()
+
+    def add(self, result, version_before=None):
+        """
+        Record a newly stored result. `version_before` is the store version read
+        just before the insert; if nothing else wrote in between, the boards stay valid.
+        """
+        try:
+            entry = _entry(result)
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            if version_before is not None and version_before != self._version:
+                self._boards.clear()
+            for position in {None, entry["position"]}:
+                board = self._boards.get(position)
+                if board is not None:
+                    board.push(entry)
+            self._version = self.store.version()
+
+    def remove(self, result, version_before=None):
+        """Record a deleted result, backfilling any board it was on from the store."""
+        result_id = result["id"]
+        with self._lock:
+            if version_before is not None and version_before != self._version:
+                self._boards.clear()
+            for position in {None, result.get("position")}:
+                board = self._boards.get(position)
+                if board is not None and board.remove(result_id):
+                    # The K+1th candidate moves up: pull it from the score index
+                    for candidate in self.store.top_by_score(position, self.k):
+                        if candidate["id"] not in board:
+                            board.push(_entry(candidate))
+            self._version = self.store.version()
+
+    def top(self, position=None):
+        with self._lock:
+            self._sync()
+            return self._board(position).ranked()
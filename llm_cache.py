@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import CACHE_LOOKUPS, span
+
+DEFAULT_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+DEFAULT_PATH = os.getenv("LLM_CACHE_PATH")
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so cosmetic differences do not defeat the cache."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def prompt_key(model, prompt):
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_prompt(prompt).encode("utf-8"))
+    return h.hexdigest()
+
+
+class MemoryBackend:
+    """Per-process LRU dict."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def set(self, key, item):
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteBackend:
+    """Shared across gunicorn workers and restarts; evicts least recently used rows."""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join("data", "llm_cache.sqlite3")
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " item TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT item FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def set(self, key, item):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, item, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(item), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+class FileBackend:
+    """One JSON file per entry in a directory; eviction uses file mtimes."""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join("data", "llm_cache")
+        self.max_entries = max_entries
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                item = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(self._file(key))
+        return item
+
+    def set(self, key, item):
+        tmp_path = self._file(key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(item, f)
+        os.replace(tmp_path, self._file(key))
+
+        entries = [e for e in os.scandir(self.path) if e.name.endswith(".json")]
+        if len(entries) > self.max_entries:
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".json"):
+                os.remove(entry.path)
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "sqlite": SQLiteBackend,
+    "file": FileBackend,
+}
+
+
+class LLMCache:
+    """
+    Response cache for generate_content calls, keyed by model name plus a hash
+    of the normalized prompt. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, backend=DEFAULT_BACKEND, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, path=DEFAULT_PATH):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LLM cache backend '{backend}'. Use one of: {', '.join(BACKENDS)}")
+        self.backend_name = backend
+        if backend == "memory":
+            self.backend = MemoryBackend(max_entries)
+        else:
+            self.backend = BACKENDS[backend](path, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.seconds_saved = 0.0
+
+    def generate(self, client, model, prompt, use_cache=True):
+        """Return the response text for `prompt`, calling the model only on a miss."""
+        key = prompt_key(model, prompt)
+        if use_cache:
+            item = self.backend.get(key)
+            if item is not None and time.time() - item["created_at"] <= self.ttl:
+                with self._lock:
+                    self.hits += 1
+                    self.seconds_saved += item.get("latency", 0.0)
+                CACHE_LOOKUPS.inc(cache="llm", result="hit")
+                return item["text"]
+            if item is not None:
+                self.backend.delete(key)
+
+        start = time.perf_counter()
+        with span("gemini.generate_content"):
+            resp = client.models.generate_content(model=model, contents=prompt)
+        latency = time.perf_counter() - start
+        text = resp.text
+
+        with self._lock:
+            if use_cache:
+                self.misses += 1
+            else:
+                self.bypassed += 1
+        CACHE_LOOKUPS.inc(cache="llm", result="miss" if use_cache else "bypass")
+        # A bypassed call still refreshes the entry, so the next cached read sees the fresh answer
+        self.backend.set(key, {"text": text, "model": model, "created_at": time.time(), "latency": latency})
+        return text
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend_name,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+            }
+
+    def clear(self):
+        self.backend.clear()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = LLMCache()
+    return _default_cache
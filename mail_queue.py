@@ -0,0 +1,324 @@
+import os
+import time
+import sqlite3
+import smtplib
+import threading
+from datetime import datetime
+from email.message import EmailMessage
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.getenv("OUTBOX_DB_PATH", os.path.join("data", "outbox.sqlite3"))
+# Notifications wait this long so a burst of submissions goes out as one
+# digest per recipient; set MAIL_DIGEST_INTERVAL=0 to send each one at once.
+DIGEST_INTERVAL = float(os.getenv("MAIL_DIGEST_INTERVAL", "60"))
+# A 'sending' row claimed longer ago than this was orphaned by a crash or restart
+CLAIM_TIMEOUT = float(os.getenv("MAIL_CLAIM_TIMEOUT", "300"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachment_path TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def smtp_settings():
+    """SMTP connection settings; point SMTP_HOST/SMTP_PORT at a local stand-in server for tests."""
+    return {
+        "host": os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "465")),
+        "use_ssl": os.getenv("SMTP_SSL", "1") != "0",
+        "username": os.getenv("EMAIL_ADDRESS"),
+        "password": os.getenv("EMAIL_PASSWORD"),
+    }
+
+
+def connect_smtp(settings=None):
+    settings = settings or smtp_settings()
+    if settings["use_ssl"]:
+        smtp = smtplib.SMTP_SSL(settings["host"], settings["port"], timeout=30)
+    else:
+        smtp = smtplib.SMTP(settings["host"], settings["port"], timeout=30)
+    if settings["username"] and settings["password"]:
+        smtp.login(settings["username"], settings["password"])
+    return smtp
+
+
+def build_message(to_email, subject, body, attachment_path=None, from_email=None):
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = from_email or os.getenv('EMAIL_ADDRESS')
+    msg['To'] = to_email
+    msg.set_content(body)
+
+    # Attach the CSV file
+    if attachment_path:
+        with open(attachment_path, 'rb') as f:
+            file_data = f.read()
+            file_name = os.path.basename(attachment_path)
+        msg.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
+    return msg
+
+
+def send_email_with_csv(to_email, subject, body, attachment_path):
+    """Send one email synchronously. Request handlers should enqueue instead."""
+    with connect_smtp() as smtp:
+        smtp.send_message(build_message(to_email, subject, body, attachment_path))
+
+
+def build_digest(jobs):
+    """Fold several queued notifications for one recipient into a single message."""
+    if len(jobs) == 1:
+        job = jobs[0]
+        return build_message(job["to_email"], job["subject"], job["body"], job["attachment_path"])
+
+    lines = [f"{len(jobs)} notifications since the last update:", ""]
+    for job in jobs:
+        created = datetime.fromtimestamp(job["created_at"]).strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f"[{created}] {job['subject']}")
+        lines.append(job["body"])
+        lines.append("")
+    # Attachments are snapshots of the same CSV, so the newest one covers the rest
+    attachment = next((j["attachment_path"] for j in reversed(jobs) if j["attachment_path"]), None)
+    return build_message(
+        jobs[0]["to_email"],
+        f"{jobs[-1]['subject']} (+{len(jobs) - 1} more)",
+        "\n".join(lines),
+        attachment,
+    )
+
+
+class MailQueue:
+    """
+    Durable outbox for HR notifications.
+    enqueue() only inserts a row; worker threads pick up due rows, group them
+    per recipient into digests, and send each batch over one SMTP connection.
+    Failures are retried with exponential backoff until max_attempts.
+    Rows left pending by a previous process are sent once start() runs, and
+    rows it had claimed are picked up again after claim_timeout.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, workers=None, digest_interval=None,
+                 max_attempts=None, backoff_base=None, smtp_factory=connect_smtp, claim_timeout=None):
+        self.db_path = db_path
+        self.workers = workers if workers is not None else int(os.getenv("MAIL_WORKERS", "1"))
+        self.digest_interval = digest_interval if digest_interval is not None else DIGEST_INTERVAL
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("MAIL_BACKOFF_SECONDS", "30"))
+        self.smtp_factory = smtp_factory
+        self.claim_timeout = claim_timeout if claim_timeout is not None else CLAIM_TIMEOUT
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._owner_pid = None
+        self._start_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, to_email, subject, body, attachment_path=None):
+        """Persist a notification and return its outbox id. Never touches SMTP."""
+        if not to_email:
+            raise ValueError("Recipient email address is required")
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO outbox (to_email, subject, body, attachment_path, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (to_email, subject, body, attachment_path, now + self.digest_interval, now),
+            )
+        self.start()
+        self._wake.set()
+        return cur.lastrowid
+
+    def start(self):
+        """Start worker threads once per process (safe to call after a fork)."""
+        with self._start_lock:
+            if self._owner_pid == os.getpid() and any(t.is_alive() for t in self._threads):
+                return
+            self._owner_pid = os.getpid()
+            self._stop.clear()
+            self._threads = []
+            for i in range(max(1, self.workers)):
+                t = threading.Thread(target=self._run, name=f"mail-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _claim(self):
+        """
+        Atomically claim every due row for one recipient. Once one is due, the
+        recipient's other first attempts go with it, so notifications queued
+        during the digest window are sent together rather than one by one.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                (now - self.claim_timeout,),
+            )
+            row = conn.execute(
+                "SELECT to_email FROM outbox WHERE status = 'pending' AND next_attempt_at <= ?"
+                " ORDER BY next_attempt_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return []
+            jobs = conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND to_email = ?"
+                " AND (next_attempt_at <= ? OR attempts = 0) ORDER BY created_at",
+                (row["to_email"], now),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                [(now, job["id"]) for job in jobs],
+            )
+        return [dict(job) for job in jobs]
+
+    def _finish(self, jobs, error=None):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            for job in jobs:
+                if error is None:
+                    conn.execute(
+                        "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                        (now, job["id"]),
+                    )
+                    continue
+                attempts = job["attempts"] + 1
+                status = "failed" if attempts >= self.max_attempts else "pending"
+                delay = self.backoff_base * (2 ** (attempts - 1))
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (status, attempts, now + delay, str(error), job["id"]),
+                )
+
+    def process_due(self):
+        """
+        Send everything that is due, one SMTP connection for the whole batch.
+        Returns the number of outbox rows delivered. Workers call this in a loop;
+        tests can call it directly.
+        """
+        batches = []
+        while True:
+            jobs = self._claim()
+            if not jobs:
+                break
+            batches.append(jobs)
+        if not batches:
+            return 0
+
+        delivered = 0
+        try:
+            smtp = self.smtp_factory()
+        except Exception as e:
+            print(f"Error connecting to SMTP server: {e}")
+            for jobs in batches:
+                self._finish(jobs, e)
+            return 0
+
+        try:
+            for jobs in batches:
+                try:
+                    smtp.send_message(build_digest(jobs))
+                except Exception as e:
+                    print(f"Error sending email to {jobs[0]['to_email']}: {e}")
+                    self._finish(jobs, e)
+                    continue
+                self._finish(jobs)
+                delivered += len(jobs)
+        finally:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
+        return delivered
+
+    def _next_due_in(self):
+        # Stale claims count too: they become pending again once claim_timeout passes
+        row = self._conn().execute(
+            "SELECT MIN(CASE WHEN status = 'pending' THEN next_attempt_at ELSE claimed_at + ? END)"
+            " FROM outbox WHERE status IN ('pending', 'sending')",
+            (self.claim_timeout,),
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.process_due()
+                wait = self._next_due_in()
+            except Exception as e:
+                print(f"Error in mail worker: {e}")
+                wait = self.backoff_base
+            self._wake.wait(timeout=60 if wait is None else min(wait, 60))
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def failed(self, limit=50):
+        rows = self._conn().execute(
+            "SELECT id, to_email, subject, attempts, last_error, created_at FROM outbox"
+            " WHERE status = 'failed' ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_mail_queue():
+    """
+    Process-wide outbox used by /submit-result. Its workers run in every
+    process that uses it (gunicorn starts them in post_fork), so rows queued
+    before a restart go out without waiting for the next submission.
+    """
+    global _default_queue
+    if _default_queue is None:
+        with _default_lock:
+            if _default_queue is None:
+                _default_queue = MailQueue()
+    _default_queue.start()
+    return _default_queue
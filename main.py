@@ -1,10 +1,13 @@
 import os
 import json
 from pathlib import Path
-from docx import Document
-import PyPDF2
 from dotenv import load_dotenv
 from google import genai
+from llm_cache import get_llm_cache
+from metrics import BYTES_WRITTEN, timed
+import extraction
+
+MODEL_NAME = "gemini-2.0-flash"
 
 
 def load_env():
@@ -16,6 +19,7 @@ def load_env():
     return api_key
 
 
+@timed("init_gemini")
 def init_gemini():
     """Initialize and return the Gemini client."""
     api_key = load_env()
@@ -24,26 +28,19 @@ def init_gemini():
 
 
 def extract_text(path: str) -> str:
-    """Extract text content from txt, pdf, or docx files."""
-    ext = path.lower().split('.')[-1]
-    if ext == "txt":
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-    elif ext == "pdf":
-        text = ""
-        with open(path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        return text
-    elif ext == "docx":
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-    else:
-        raise ValueError("Unsupported file type. Please upload a .txt, .pdf, or .docx")
-
-
-def generate_questions(client, resume: str, jd: str, n: int = 6) -> list[str]:
+    """
+    Extract text content from txt, pdf, or docx files.
+    Parsing is cached by content hash and bounded by the limits in extraction.py.
+    """
+    return extraction.extract_text(path)
+
+
+def generate_content(client, prompt: str, use_cache: bool = True) -> str:
+    """Call Gemini through the prompt cache. Pass use_cache=False to force a fresh answer."""
+    return get_llm_cache().generate(client, MODEL_NAME, prompt, use_cache=use_cache)
+
+
+def generate_questions(client, resume: str, jd: str, n: int = 6, use_cache: bool = True) -> list[str]:
     """Use Gemini to generate n interview questions based on resume and JD."""
     prompt = (
         f"Given the following résumé:\n{resume}\n\n"
@@ -55,11 +52,7 @@ def generate_questions(client, resume: str, jd: str, n: int = 6) -> list[str]:
         f"3. Return only a cleanly numbered list (e.g., 1. ..., 2. ..., etc) of {n} concise, high-quality questions. No introduction or explanation."
     )
 
-    resp = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-    )
-    text = resp.text.strip()
+    text = generate_content(client, prompt, use_cache=use_cache).strip()
 
     # Extract numbered questions
     questions = []
@@ -78,16 +71,15 @@ def generate_questions(client, resume: str, jd: str, n: int = 6) -> list[str]:
     return questions
 
 
-def follow_up_question(client, history: list[dict]) -> str:
+def follow_up_question(client, history: list[dict], use_cache: bool = True) -> str:
     """Generate a follow-up interview question based on past Q&A."""
     prompt = "Based on the following Q&A history, generate the next best interview question. Return only the question text."
     for i, qa in enumerate(history, start=1):
         prompt += f"\n{i}. Q: {qa['question']} A: {qa['answer']}"
-    resp = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-    return resp.text.strip()
+    return generate_content(client, prompt, use_cache=use_cache).strip()
 
 
-def score_history(client, history: list[dict]) -> str:
+def score_history(client, history: list[dict], use_cache: bool = True) -> str:
     """Score each Q&A pair and return structured feedback as JSON."""
     prompt = (
         "You are given a series of interview questions and answers, along with the candidate’s résumé and the job description.\n"
@@ -95,37 +87,58 @@ def score_history(client, history: list[dict]) -> str:
         "Respond only in strict JSON format: { 'scores': [int, ...], 'feedback': str }"
     )
     prompt += "\nHistory:" + json.dumps(history, indent=2)
-    resp = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-    return resp.text.strip()
+    return generate_content(client, prompt, use_cache=use_cache).strip()
 
 
+@timed("save_history")
 def save_history(history: list[dict], path: str):
     """Save the Q&A history to a file."""
     try:
+        body = json.dumps(history, indent=2)
         with open(path, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2)
+            BYTES_WRITTEN.inc(f.write(body), kind="history")
     except Exception as e:
         print(f"Error saving history: {e}")
 
 
-def run_qna_pipeline(resume_path: str, jd_path: str, history_path: str, flask_mode: bool = False):
+def load_jd_text(jd_path: str = None, jd_id: str = None) -> str:
+    """JD text from the JD registry when a jd_id is given, otherwise from the file."""
+    if jd_id:
+        from jd_registry import get_jd_registry
+        record = get_jd_registry().get(jd_id)
+        if record is None:
+            raise ValueError(f"Unknown job description id: {jd_id}")
+        return record["text"]
+    if not jd_path:
+        raise ValueError("Either a job description file or a jd_id is required")
+    return extract_text(jd_path)
+
+
+def run_qna_pipeline(resume_path: str, jd_path: str, history_path: str, flask_mode: bool = False, client=None,
+                     use_cache: bool = True, jd_id: str = None):
     """
     Generate interview questions using Gemini and save initial Q&A history.
+    Pass `client` to use an already-initialised (or fake) Gemini client, and
+    use_cache=False to bypass the prompt cache for fresh questions.
+    With `jd_id`, the registered JD text is used and `jd_path` may be None.
 
     Returns:
         dict: { "questions": [str, ...] }
     """
-    client = init_gemini()
+    if client is None:
+        client = init_gemini()
     resume = extract_text(resume_path)
-    jd = extract_text(jd_path)
+    jd = load_jd_text(jd_path, jd_id)
 
-    questions = generate_questions(client, resume, jd)
+    questions = generate_questions(client, resume, jd, use_cache=use_cache)
     history = []
 
     if flask_mode:
         for q in questions:
             history.append({"question": q, "answer": "<user_input_required>"})
-        save_history(history, history_path)
+        # Session-scoped callers keep the history themselves and pass history_path=None
+        if history_path:
+            save_history(history, history_path)
         return {"questions": questions}
 
     # If not in flask_mode, voice/CLI mode is not yet implemented
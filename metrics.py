@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import sqlite3
+import threading
+import functools
+from contextlib import contextmanager
+
+# Each process keeps its metrics in memory and periodically writes its
+# absolute values to one SQLite file (a row per series per process);
+# /metrics sums the rows, so counters and histograms add up across gunicorn
+# workers. Scrape-time gauges (queue depth etc.) are computed by callbacks.
+# When a worker exits its rows are folded into one 'retired' row per series,
+# so restarts do not grow the table.
+RETIRED = "retired"
+DEFAULT_DB_PATH = os.getenv("METRICS_DB_PATH", os.path.join("data", "metrics.sqlite3"))
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Seconds; covers a cached lookup (sub-millisecond) up to a slow Gemini call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    series TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    process TEXT NOT NULL,
+    value REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (series, labels, process)
+);
+"""
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        self.registry._add(self.name, _label_key(labels), amount)
+
+
+class Histogram:
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.kind = "histogram"
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        # Every bucket gets a series (adding 0 below the value), so none is missing from a scrape
+        updates = [(f"{self.name}_bucket", key + (("le", _format_value(bound)),), 1.0 if value <= bound else 0.0)
+                   for bound in self.buckets]
+        updates.append((f"{self.name}_sum", key, value))
+        updates.append((f"{self.name}_count", key, 1.0))
+        self.registry._add_many(updates)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    def __init__(self, db_path=DEFAULT_DB_PATH, flush_interval=FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._gauges = {}
+        self._values = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._process = None
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def _conn(self):
+        # Opened on first flush or scrape, so importing this module touches no files
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---- definitions -----------------------------------------------------
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._define(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._define(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn):
+        """
+        Gauge computed at scrape time. fn() returns a number, or a dict mapping
+        label tuples ((name, value), ...) to numbers.
+        """
+        self._gauges[name] = (help_text, fn)
+
+    def _define(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    # ---- recording -------------------------------------------------------
+
+    def _ensure_process(self):
+        # Called with _lock held. A forked child starts from zero under its own
+        # process key; the parent still reports what it recorded before the fork.
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._process = f"{pid}-{uuid.uuid4().hex[:8]}"
+            self._values = {}
+            self._flusher = None
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _add(self, series, key, amount):
+        with self._lock:
+            self._ensure_process()
+            self._values[(series, key)] = self._values.get((series, key), 0.0) + amount
+            self._dirty = True
+
+    def _add_many(self, updates):
+        with self._lock:
+            self._ensure_process()
+            for series, key, amount in updates:
+                self._values[(series, key)] = self._values.get((series, key), 0.0) + amount
+            self._dirty = True
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing metrics: {e}")
+
+    def flush(self):
+        """Write this process's current values to the shared database."""
+        # One flush at a time, so an older snapshot never overwrites a newer one
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty or self._pid != os.getpid():
+                    return
+                rows = [(series, json.dumps(key), self._process, value, time.time())
+                        for (series, key), value in self._values.items()]
+                self._dirty = False
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO samples (series, labels, process, value, updated_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (series, labels, process) DO UPDATE SET"
+                    " value = excluded.value, updated_at = excluded.updated_at",
+                    rows,
+                )
+
+    def retire(self, pid=None):
+        """
+        Fold a finished process's rows into the 'retired' rows, keeping the sums
+        the same. With no pid, flush and retire this process (gunicorn's
+        worker_exit); the master passes the pid of a worker that was killed.
+        """
+        if pid is None:
+            self.flush()
+            with self._lock:
+                process = self._process if self._pid == os.getpid() else None
+                # Anything recorded after this starts over under a new process key
+                self._pid = None
+                self._values = {}
+                self._dirty = False
+            if process is None:
+                return
+            where, params = "process = ?", (process,)
+        else:
+            where, params = "process LIKE ?", (f"{int(pid)}-%",)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO samples (series, labels, process, value, updated_at)"
+                f" SELECT series, labels, ?, value, ? FROM samples WHERE {where}"
+                " ON CONFLICT (series, labels, process) DO UPDATE SET"
+                " value = value + excluded.value, updated_at = excluded.updated_at",
+                (RETIRED, time.time()) + params,
+            )
+            conn.execute(f"DELETE FROM samples WHERE {where}", params)
+
+    # ---- exposition ------------------------------------------------------
+
+    def _family(self, series):
+        if series in self._metrics:
+            return series
+        for suffix in ("_bucket", "_sum", "_count"):
+            base = series[:-len(suffix)]
+            if series.endswith(suffix) and base in self._metrics:
+                return base
+        return series
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4), summed across processes."""
+        self.flush()
+        rows = self._conn().execute(
+            "SELECT series, labels, SUM(value) FROM samples GROUP BY series, labels"
+        ).fetchall()
+
+        families = {}
+        for series, labels, value in rows:
+            pairs = tuple(tuple(p) for p in json.loads(labels))
+            families.setdefault(self._family(series), []).append((series, pairs, value))
+
+        lines = []
+        for name in sorted(set(families) | set(self._metrics)):
+            metric = self._metrics.get(name)
+            if metric is not None:
+                lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            samples = families.get(name, [])
+            # Group each histogram's series by label set, with buckets in `le` order
+            samples.sort(key=lambda s: (
+                tuple(p for p in s[1] if p[0] != "le"),
+                {"_bucket": 0, "_sum": 1, "_count": 2}.get(s[0][len(name):], 0),
+                float(dict(s[1]).get("le", "0").replace("+Inf", "inf")),
+            ))
+            for series, pairs, value in samples:
+                lines.append(f"{series}{_format_labels(pairs)} {_format_value(value)}")
+
+        for name in sorted(self._gauges):
+            help_text, fn = self._gauges[name]
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"Error collecting gauge {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            items = value.items() if isinstance(value, dict) else [((), value)]
+            for pairs, v in items:
+                lines.append(f"{name}{_format_labels(tuple((k, str(x)) for k, x in pairs))} {_format_value(v)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forget every recorded value, in memory and in the shared database."""
+        with self._lock:
+            self._values = {}
+            self._dirty = False
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM samples")
+
+
+_registry = Registry()
+
+
+def get_registry():
+    return _registry
+
+
+# Metrics shared by the app's modules
+STAGE_SECONDS = _registry.histogram(
+    "hireiq_stage_duration_seconds", "Time spent in one stage of a request or job.", ("stage",))
+REQUEST_SECONDS = _registry.histogram(
+    "hireiq_http_request_duration_seconds", "HTTP request latency.", ("endpoint", "method", "status"))
+CACHE_LOOKUPS = _registry.counter(
+    "hireiq_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+MODEL_LOADS = _registry.counter(
+    "hireiq_model_loads_total", "Models loaded, summed over processes.", ("model",))
+BYTES_WRITTEN = _registry.counter(
+    "hireiq_file_bytes_written_total", "Bytes written to local files.", ("kind",))
+
+
+@contextmanager
+def span(stage):
+    """Time a block: `with span("extract_text"): ...`."""
+    with STAGE_SECONDS.time(stage=stage):
+        yield
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
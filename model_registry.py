@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+
+from metrics import MODEL_LOADS, STAGE_SECONDS
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# One entry per model name, shared by every module in this process
+_models = {}
+_load_errors = {}
+_load_seconds = {}
+_loaders = {}
+_lock = threading.Lock()
+_model_locks = {}
+
+
+def _model_lock(name):
+    with _lock:
+        return _model_locks.setdefault(name, threading.Lock())
+
+
+def get_model(name=DEFAULT_MODEL):
+    """
+    Return the SentenceTransformer for `name`, loading it on first use.
+    Concurrent callers wait for the same load instead of starting their own.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _model_lock(name):
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            try:
+                # Imported here: pulling in torch alone takes seconds and should not delay /health
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(name)
+            except Exception as e:
+                _load_errors[name] = str(e)
+                raise
+            _load_seconds[name] = round(time.perf_counter() - start, 3)
+            MODEL_LOADS.inc(model=name)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="model.load")
+            _load_errors.pop(name, None)
+            _models[name] = model
+    return model
+
+
+def register(name, model):
+    """Use an already-constructed model for `name` (e.g. a stub encoder in benchmarks)."""
+    with _model_lock(name):
+        _models[name] = model
+        _load_seconds.setdefault(name, 0.0)
+        _load_errors.pop(name, None)
+
+
+def load_in_background(name=DEFAULT_MODEL):
+    """Start loading `name` on a daemon thread so the caller can keep serving requests."""
+    if name in _models:
+        return None
+    with _lock:
+        thread = _loaders.get(name)
+        if thread is None or not thread.is_alive():
+            def _load():
+                try:
+                    get_model(name)
+                except Exception as e:
+                    print(f"Error loading model {name}: {e}")
+
+            thread = threading.Thread(target=_load, name=f"model-loader-{name}", daemon=True)
+            _loaders[name] = thread
+            thread.start()
+    return thread
+
+
+def preload(names=None):
+    """
+    Load models synchronously. Called in the gunicorn master before workers fork,
+    so the weights are shared copy-on-write instead of loaded once per worker.
+    """
+    if names is None:
+        names = [n.strip() for n in os.getenv("PRELOAD_MODELS", DEFAULT_MODEL).split(",") if n.strip()]
+    for name in names:
+        get_model(name)
+
+
+def is_ready(name=DEFAULT_MODEL):
+    return name in _models
+
+
+def status():
+    """Per-model readiness for the health endpoints."""
+    names = set(_models) | set(_loaders) | set(_load_errors) | {DEFAULT_MODEL}
+    report = {}
+    for name in sorted(names):
+        loader = _loaders.get(name)
+        if name in _models:
+            state = "ready"
+        elif name in _load_errors:
+            state = "error"
+        elif loader is not None and loader.is_alive():
+            state = "loading"
+        else:
+            state = "not_loaded"
+        report[name] = {
+            "state": state,
+            "load_seconds": _load_seconds.get(name),
+            "error": _load_errors.get(name),
+        }
+    return report
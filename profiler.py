@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import hmac
+import uuid
+import sqlite3
+import threading
+from collections import Counter
+
+# Opt-in request profiling. Nothing here runs unless PROFILER_TOKEN is set and
+# a request either carries the token with a profile flag, or targets an
+# endpoint armed with "profile the next N requests".
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+TARGETS_REFRESH = 1.0  # seconds a worker trusts its cached list of armed endpoints
+MAX_PROFILES = int(os.getenv("PROFILE_KEEP", "200"))  # newest profiles kept; 0 keeps every one
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_targets (
+    endpoint TEXT PRIMARY KEY,
+    remaining INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    endpoint TEXT,
+    method TEXT,
+    path TEXT,
+    status INTEGER,
+    duration REAL,
+    samples INTEGER,
+    trigger TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_created ON profiles (created_at);
+"""
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """One stack as 'outer;...;inner', the collapsed format flamegraph.pl and speedscope read."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Sampler:
+    """
+    Samples one thread's stack every `interval` seconds from a helper thread.
+    The profiled thread runs unmodified; the cost is the helper's wakeups.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.started_at = None
+        self.duration = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.stacks
+
+
+class Profiler:
+    """Armed endpoints and saved profiles, shared by every worker through SQLite."""
+
+    def __init__(self, directory=PROFILE_DIR, token=PROFILER_TOKEN, interval=SAMPLE_INTERVAL,
+                 max_profiles=MAX_PROFILES):
+        self.directory = directory
+        self.token = token
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self.db_path = os.path.join(directory, "profiles.sqlite3")
+        self._local = threading.local()
+        self._targets = frozenset()
+        self._targets_checked = 0.0
+        self._targets_lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            conn = self._conn()
+            conn.executescript(SCHEMA)
+            conn.commit()
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def authorized(self, token):
+        return self.enabled and bool(token) and hmac.compare_digest(str(token), self.token)
+
+    # ---- "profile the next N requests to endpoint X" ---------------------
+
+    def arm(self, endpoint, count):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO profile_targets (endpoint, remaining, created_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (endpoint) DO UPDATE SET remaining = excluded.remaining",
+                (endpoint, int(count), time.time()),
+            )
+        self._targets_checked = 0.0
+
+    def disarm(self, endpoint):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM profile_targets WHERE endpoint = ?", (endpoint,))
+        self._targets_checked = 0.0
+
+    def targets(self):
+        rows = self._conn().execute("SELECT endpoint, remaining FROM profile_targets ORDER BY endpoint").fetchall()
+        return {row["endpoint"]: row["remaining"] for row in rows}
+
+    def is_armed(self, endpoint):
+        """Cheap per-request check; the armed list is re-read at most once per TARGETS_REFRESH."""
+        now = time.monotonic()
+        if now - self._targets_checked > TARGETS_REFRESH:
+            with self._targets_lock:
+                if now - self._targets_checked > TARGETS_REFRESH:
+                    self._targets = frozenset(self.targets())
+                    self._targets_checked = now
+        return endpoint in self._targets
+
+    def claim(self, endpoint):
+        """Take one of the endpoint's remaining profiles; False if another worker took the last."""
+        conn = self._conn()
+        with conn:
+            taken = conn.execute(
+                "UPDATE profile_targets SET remaining = remaining - 1 WHERE endpoint = ? AND remaining > 0",
+                (endpoint,),
+            ).rowcount
+            conn.execute("DELETE FROM profile_targets WHERE remaining <= 0")
+        return bool(taken)
+
+    # ---- saved profiles --------------------------------------------------
+
+    def path(self, profile_id):
+        return os.path.join(self.directory, f"{profile_id}.folded")
+
+    def save(self, sampler, endpoint, method, path, status, trigger):
+        """Write the sampler's stacks as <id>.folded and record it; returns the profile id."""
+        profile_id = time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
+        lines = [f"{stack} {count}\n" for stack, count in sampler.stacks.most_common()]
+        with open(self.path(profile_id), "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO profiles (id, endpoint, method, path, status, duration, samples, trigger, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (profile_id, endpoint, method, path, status, round(sampler.duration, 6),
+                 sum(sampler.stacks.values()), trigger, time.time()),
+            )
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        """Delete all but the newest max_profiles profiles, rows and files."""
+        if self.max_profiles <= 0:
+            return
+        conn = self._conn()
+        with conn:
+            stale = [row["id"] for row in conn.execute(
+                "SELECT id FROM profiles ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.max_profiles,)
+            ).fetchall()]
+            conn.executemany("DELETE FROM profiles WHERE id = ?", [(pid,) for pid in stale])
+        for profile_id in stale:
+            try:
+                os.remove(self.path(profile_id))
+            except FileNotFoundError:
+                pass
+
+    def list(self, limit=100):
+        rows = self._conn().execute(
+            "SELECT * FROM profiles ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, profile_id):
+        row = self._conn().execute("SELECT * FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return dict(row) if row else None
+
+
+_default_profiler = None
+_default_lock = threading.Lock()
+
+
+def get_profiler():
+    global _default_profiler
+    if _default_profiler is None:
+        with _default_lock:
+            if _default_profiler is None:
+                _default_profiler = Profiler()
+    return _default_profiler
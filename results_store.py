@@ -0,0 +1,340 @@
+import os
+import json
+import base64
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from metrics import span
+
+DEFAULT_DB_PATH = os.getenv("RESULTS_DB_PATH", os.path.join("data", "results.sqlite3"))
+LEGACY_RESULTS_FILE = os.path.join("data", "interview_results.json")
+
+# Columns pulled out of the result document so they can be indexed and filtered on.
+# The full document (qa_pairs, categories, ...) is kept as JSON in `data`.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    position TEXT,
+    score REAL,
+    timestamp TEXT,
+    type TEXT,  -- NULL for interview results; 'screening' for bulk-screening shortlists
+    data TEXT NOT NULL
+);
+-- Replaces idx_results_timestamp (timestamp only) from earlier databases
+DROP INDEX IF EXISTS idx_results_timestamp;
+CREATE INDEX IF NOT EXISTS idx_results_timestamp_id ON results (timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_results_position ON results (position, timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_score ON results (score);
+CREATE INDEX IF NOT EXISTS idx_results_position_score ON results (position, score);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+-- Bumped by triggers on every write; used to build cheap ETags
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO state (key, value) VALUES ('version', 0);
+CREATE TRIGGER IF NOT EXISTS results_version_insert AFTER INSERT ON results
+BEGIN UPDATE state SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS results_version_update AFTER UPDATE ON results
+BEGIN UPDATE state SET value = value + 1 WHERE key = 'version'; END;
+CREATE TRIGGER IF NOT EXISTS results_version_delete AFTER DELETE ON results
+BEGIN UPDATE state SET value = value + 1 WHERE key = 'version'; END;
+"""
+
+SORT_COLUMNS = ("timestamp", "id")
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value, result_id):
+    raw = json.dumps([sort_value, result_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        sort_value, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return sort_value, result_id
+
+
+def _to_row(result):
+    score = result.get("score")
+    try:
+        score = float(score) if score is not None and score != "" else None
+    except (TypeError, ValueError):
+        score = None
+    return (
+        str(result["id"]),
+        result.get("name"),
+        result.get("email"),
+        result.get("position"),
+        score,
+        result.get("timestamp") or "",
+        result.get("type"),
+        json.dumps(result),
+    )
+
+
+def _date_only(value):
+    """The date for a 'YYYY-MM-DD' bound, or None for anything longer."""
+    if len(value) != 10:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _type_filter(result_type):
+    # Interview results have no type; other kinds never mix into their listings and exports
+    if result_type is None:
+        return "type IS NULL", []
+    return "type = ?", [result_type]
+
+
+def _filters(position=None, min_score=None, max_score=None, since=None, until=None, after=None,
+             result_type=None):
+    """WHERE clauses and parameters shared by the paged and streaming queries."""
+    clause, params = _type_filter(result_type)
+    where = [clause]
+    if position:
+        where.append("position = ?")
+        params.append(position)
+    if min_score is not None:
+        where.append("score >= ?")
+        params.append(float(min_score))
+    if max_score is not None:
+        where.append("score <= ?")
+        params.append(float(max_score))
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if after:
+        where.append("timestamp > ?")
+        params.append(after)
+    if until:
+        day = _date_only(until)
+        if day is not None:
+            # A bare date covers that whole day: timestamps are full ISO datetimes
+            where.append("timestamp < ?")
+            params.append((day + timedelta(days=1)).isoformat())
+        else:
+            where.append("timestamp <= ?")
+            params.append(until)
+    return where, params
+
+
+class ResultsStore:
+    """
+    SQLite-backed store for interview results.
+    Runs in WAL mode so readers never block the single writer, and every
+    write touches one row instead of rewriting the whole results file.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, legacy_json=LEGACY_RESULTS_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._add_type_column()
+        if legacy_json:
+            self.migrate_from_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _add_type_column(self):
+        """Databases created before bulk screening lack results.type; add and backfill it."""
+        conn = self._conn()
+        if any(row[1] == "type" for row in conn.execute("PRAGMA table_info(results)")):
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if any(row[1] == "type" for row in conn.execute("PRAGMA table_info(results)")):
+                return
+            conn.execute("ALTER TABLE results ADD COLUMN type TEXT")
+            conn.execute("UPDATE results SET type = json_extract(data, '$.type')"
+                         " WHERE json_extract(data, '$.type') IS NOT NULL")
+
+    def migrate_from_json(self, json_path):
+        """One-shot import of the legacy interview_results.json. Returns rows imported."""
+        conn = self._conn()
+        migration = f"json_import:{os.path.abspath(json_path)}"
+        if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (migration,)).fetchone():
+            return 0
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            legacy = []
+
+        rows = [_to_row(r) for r in legacy if isinstance(r, dict) and r.get("id")]
+        with conn:
+            # BEGIN IMMEDIATE so two workers starting together do not both import
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (migration,)).fetchone():
+                return 0
+            conn.executemany(
+                "INSERT OR IGNORE INTO results (id, name, email, position, score, timestamp, type, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT INTO migrations (name) VALUES (?)", (migration,))
+        return len(rows)
+
+    def insert(self, result):
+        """Insert (or replace) a single result document. It must carry an 'id'."""
+        conn = self._conn()
+        with span("results.insert"), conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (id, name, email, position, score, timestamp, type, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                _to_row(result),
+            )
+        return result
+
+    def delete(self, result_id):
+        """Delete one result by id. Returns the deleted document, or None."""
+        conn = self._conn()
+        with conn:
+            row = conn.execute("SELECT data FROM results WHERE id = ?", (result_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM results WHERE id = ?", (result_id,))
+        return json.loads(row[0])
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+    def get(self, result_id):
+        row = self._conn().execute("SELECT data FROM results WHERE id = ?", (result_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def iter_results(self, newest_first=True):
+        """Yield result documents in timestamp order, straight off the index."""
+        order = "DESC" if newest_first else "ASC"
+        cursor = self._conn().execute(f"SELECT data FROM results ORDER BY timestamp {order}, id {order}")
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def iter_filtered(self, position=None, min_score=None, max_score=None, since=None, until=None,
+                      after=None, newest_first=False, include_qa_pairs=False, result_type=None):
+        """
+        Stream every matching result without materialising the list.
+        `after` is an exclusive timestamp bound, for incremental exports.
+        Only interview results unless `result_type` names another kind.
+        """
+        where, params = _filters(position, min_score, max_score, since, until, after, result_type)
+        column = "data" if include_qa_pairs else "json_remove(data, '$.qa_pairs')"
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT {column} FROM results WHERE " + " AND ".join(where)
+        sql += f" ORDER BY timestamp {order}, id {order}"
+        for (data,) in self._conn().execute(sql, params):
+            yield json.loads(data)
+
+    def list_results(self, newest_first=True):
+        return list(self.iter_results(newest_first))
+
+    def top_by_score(self, position=None, limit=10, result_type=None):
+        """Highest-scoring results, optionally for one position, read off the score index."""
+        clause, params = _type_filter(result_type)
+        sql = f"SELECT data FROM results WHERE score IS NOT NULL AND {clause}"
+        if position is not None:
+            sql += " AND position = ?"
+            params.append(position)
+        sql += " ORDER BY score DESC, timestamp DESC LIMIT ?"
+        params.append(int(limit))
+        return [json.loads(data) for (data,) in self._conn().execute(sql, params)]
+
+    def version(self):
+        """Monotonic write counter; changes whenever any result is added or removed."""
+        row = self._conn().execute("SELECT value FROM state WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def query(self, position=None, min_score=None, max_score=None, since=None, until=None,
+              cursor=None, limit=50, sort="timestamp", descending=True, fields=None, result_type=None):
+        """
+        One page of results using keyset (cursor) pagination.
+        Filters are pushed down to SQLite; `fields` projects each document so
+        list views can skip the large qa_pairs transcript.
+        Returns (results, next_cursor); next_cursor is None on the last page.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        where, params = _filters(position, min_score, max_score, since, until, result_type=result_type)
+        if cursor:
+            sort_value, result_id = decode_cursor(cursor)
+            op = "<" if descending else ">"
+            if sort == "id":
+                where.append(f"id {op} ?")
+                params.append(result_id)
+            else:
+                where.append(f"(timestamp {op} ? OR (timestamp = ? AND id {op} ?))")
+                params.extend([sort_value, sort_value, result_id])
+
+        # Drop the transcript inside SQLite when the caller did not ask for it
+        column = "data"
+        if fields is not None and "qa_pairs" not in fields:
+            column = "json_remove(data, '$.qa_pairs')"
+
+        order = "DESC" if descending else "ASC"
+        order_by = f"id {order}" if sort == "id" else f"timestamp {order}, id {order}"
+        sql = f"SELECT id, timestamp, {column} FROM results WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        results = []
+        for _, _, data in rows:
+            doc = json.loads(data)
+            if fields is not None:
+                doc = {k: doc[k] for k in fields if k in doc}
+            results.append(doc)
+
+        next_cursor = None
+        if has_more and rows:
+            last_id, last_ts, _ = rows[-1]
+            next_cursor = encode_cursor(last_id if sort == "id" else last_ts, last_id)
+        return results, next_cursor
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide results store used by the Flask endpoints."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = ResultsStore()
+    return _default_store
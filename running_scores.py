@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from scorer import score_pairs
+from transcript_log import ANSWER
+
+BUCKETS = 10
+WORKERS = int(os.getenv("SCORING_WORKERS", "2"))
+
+
+def new_state(total_questions, buckets=BUCKETS):
+    """
+    Running aggregates for one interview. Bucket boundaries follow the same
+    rule as scorer.progress_buckets, fixed up front from the question count,
+    so each answer updates exactly one bucket.
+    """
+    return {
+        "offset": 0,
+        "chunk_size": max(1, total_questions // buckets),
+        "buckets": buckets,
+        "bucket_sums": [0.0] * buckets,
+        "bucket_counts": [0] * buckets,
+        # Over every non-empty answer, as evaluate_qa_pairs scores them
+        "total_sum": 0.0,
+        "total_count": 0,
+        "scores": {},  # question key -> [index, score, counted_in_total, pair_digest]
+    }
+
+
+def pair_digest(question, answer):
+    """Identifies the exact question and answer text a score was computed from."""
+    return hashlib.sha256(json.dumps([question.strip(), answer.strip()]).encode("utf-8")).hexdigest()[:16]
+
+
+def apply_score(state, key, index, score, counted, digest=None):
+    """Add one answer's score; a re-answered question replaces its old score."""
+    previous = state["scores"].get(key)
+    if previous is not None:
+        _add(state, previous[0], -previous[1], -1, previous[2])
+    state["scores"][key] = [index, score, counted, digest]
+    _add(state, index, score, 1, counted)
+
+
+def _add(state, index, score, count, counted):
+    bucket = index // state["chunk_size"]
+    if bucket < state["buckets"]:
+        state["bucket_sums"][bucket] += score
+        state["bucket_counts"][bucket] += count
+    if counted:
+        state["total_sum"] += score
+        state["total_count"] += count
+
+
+def summarize(state):
+    """Progress buckets and overall score, in the shape get_similarity_scores returns."""
+    if not state or not state["scores"]:
+        return {"error": "No valid Q&A pairs found in transcript.", "scores": [], "overall": None}
+
+    results = []
+    bucketed_sum, bucketed_count = 0.0, 0
+    for i, (total, count) in enumerate(zip(state["bucket_sums"], state["bucket_counts"])):
+        if count:
+            results.append({"progress": f"{(i + 1) * 10}%", "score": round(total / count * 100, 2)})
+            bucketed_sum += total
+            bucketed_count += count
+    overall = round(bucketed_sum / bucketed_count * 100, 2) if bucketed_count else 0.0
+    return {"scores": results, "overall": overall}
+
+
+def final_score(state, qa_pairs=None):
+    """
+    Average over all non-empty answers, the number /submit-interview stores.
+    With `qa_pairs`, None unless the state scored exactly those questions and
+    answers (the caller then scores the submitted pairs itself).
+    """
+    if not state or not state["total_count"]:
+        return None
+    if qa_pairs is not None:
+        submitted = Counter(pair_digest(p.get("question", ""), p.get("answer", "")) for p in qa_pairs
+                            if p.get("question", "").strip() and p.get("answer", "").strip())
+        scored = Counter(entry[3] if len(entry) > 3 else None
+                         for entry in state["scores"].values() if entry[2])
+        if submitted != scored:
+            return None
+    return round(state["total_sum"] / state["total_count"] * 100, 2)
+
+
+class RunningScorer:
+    """
+    Scores each answer as it is logged, on a small background pool, and keeps
+    the running aggregates in the session. Reads the session's transcript log
+    from the saved offset, so each answer is embedded exactly once.
+    """
+
+    def __init__(self, sessions, workers=WORKERS):
+        self.sessions = sessions
+        self.workers = workers
+        self._executor = None
+        self._executor_pid = None
+        self._locks = {}  # session id -> [lock, holders]; dropped once nobody holds it
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    @contextmanager
+    def _session_lock(self, session_id):
+        with self._lock:
+            entry = self._locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[session_id]
+
+    def submit(self, session_id):
+        """Score whatever has been logged for this session, off the request thread."""
+        return self._pool().submit(self._advance_logged, session_id)
+
+    def _advance_logged(self, session_id):
+        try:
+            return self.advance(session_id)
+        except Exception as e:
+            print(f"Error scoring session {session_id}: {e}")
+
+    def pending(self, session):
+        """True if the log has answers the running state has not scored yet."""
+        state = session.get("running") or {}
+        return self.sessions.transcript_log(session["id"]).size() > state.get("offset", 0)
+
+    def advance(self, session_id):
+        """Fold newly logged answers into the running state. Returns the state."""
+        with self._session_lock(session_id):
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            interview = session["interview"]
+            state = session.get("running") or new_state(len(interview))
+
+            log = self.sessions.transcript_log(session_id)
+            records, offset = log.read_from(state["offset"], ANSWER)
+            records = [r for r in records if r.get("question")]
+            if offset == state["offset"]:
+                return state
+
+            state = {**state, "scores": dict(state["scores"]),
+                     "bucket_sums": list(state["bucket_sums"]), "bucket_counts": list(state["bucket_counts"])}
+            if records:
+                scores = score_pairs([r["question"] for r in records], [r.get("answer", "") for r in records])
+                for record, score in zip(records, scores):
+                    key = record.get("question_id") or f"offset:{record['offset']}"
+                    index = interview.index_of(key)
+                    if index is None:
+                        index = len(state["scores"])
+                    counted = bool(record.get("answer", "").strip())
+                    apply_score(state, key, index, float(score), counted,
+                                pair_digest(record["question"], record.get("answer", "")))
+            state["offset"] = offset
+
+            def set_running(session):
+                # Another worker may have got further through the log already
+                if (session.get("running") or {}).get("offset", 0) < state["offset"]:
+                    session["running"] = state
+
+            self.sessions.update(session_id, set_running)
+            return state
+
+
+_default_scorer = None
+_default_lock = threading.Lock()
+
+
+def get_running_scorer():
+    global _default_scorer
+    if _default_scorer is None:
+        with _default_lock:
+            if _default_scorer is None:
+                from sessions import get_session_manager
+                _default_scorer = RunningScorer(get_session_manager())
+    return _default_scorer
@@ -1,59 +1,94 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from embedding_cache import get_cache
+from model_registry import get_model
+from transcript_log import ANSWER, TranscriptLog
+from metrics import timed
 
-# Load once at the top
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def embed_texts(texts):
+    """Normalized embeddings for a batch of texts, through the embedding cache."""
+    return get_cache().encode(
+        lambda: get_model(MODEL_NAME),
+        list(texts),
+        MODEL_NAME,
+        normalize_embeddings=True,
+        batch_size=64,
+    )
+
+
+def score_pairs(questions, answers):
+    """
+    Scores every question/answer pair in one go.
+    Questions and answers are encoded together in a single batched call with
+    normalized embeddings (texts already in the embedding cache are skipped), so cosine similarity reduces to a row-wise dot product.
+    Returns a float array with one score per pair.
+    """
+    if not questions:
+        return np.zeros(0, dtype=np.float32)
+
+    n = len(questions)
+    embeddings = embed_texts(list(questions) + list(answers))
+    return np.einsum("ij,ij->i", embeddings[:n], embeddings[n:])
+
+
+def progress_buckets(scores, buckets=10):
+    """
+    Slices a score vector into (at most) `buckets` progressive chunks.
+    Returns the per-chunk progress list and the overall average score.
+    """
+    chunk_size = max(1, len(scores) // buckets)
+    scored = scores[:chunk_size * buckets]
+
+    results = []
+    for i, start in enumerate(range(0, len(scored), chunk_size)):
+        chunk = scored[start:start + chunk_size]
+        avg_score = float(np.mean(chunk)) if len(chunk) else 0.0
+        results.append({
+            "progress": f"{(i + 1) * 10}%",
+            "score": round(avg_score * 100, 2)
+        })
+
+    overall = round(float(np.mean(scored)) * 100, 2) if len(scored) else 0.0
+    return results, overall
 
 
 def get_similarity_scores(transcript_path):
     """
-    Reads Q&A pairs from transcript.txt and evaluates cosine similarity.
+    Reads Q&A pairs from transcript.txt (or a transcript.jsonl log) and
+    evaluates cosine similarity.
     Returns chunk-based progress scores and overall average score.
     """
     try:
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        qas = []
-        question = ""
-        for line in lines:
-            if line.startswith("Q: "):
-                question = line[3:].strip()
-            elif line.startswith("A: "):
-                answer = line[3:].strip()
-                if question:
-                    qas.append((question, answer))
-                    question = ""
+        if transcript_path.endswith(".jsonl"):
+            # Structured transcript log: one record per answer
+            qas = [(r["question"].strip(), r.get("answer", "").strip())
+                   for r in TranscriptLog(transcript_path).records(ANSWER) if r.get("question")]
+        else:
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+
+            qas = []
+            question = ""
+            for line in lines:
+                if line.startswith("Q: "):
+                    question = line[3:].strip()
+                elif line.startswith("A: "):
+                    answer = line[3:].strip()
+                    if question:
+                        qas.append((question, answer))
+                        question = ""
 
         if not qas:
             raise ValueError("No valid Q&A pairs found in transcript.")
 
-        # Split into 10 chunks for progressive analysis
-        total_pairs = len(qas)
-        chunk_size = max(1, total_pairs // 10)
-        chunks = [qas[i:i + chunk_size] for i in range(0, total_pairs, chunk_size)]
-        if len(chunks) > 10:
-            chunks = chunks[:10]
-
-        results = []
-        all_scores = []
-
-        for i, chunk in enumerate(chunks):
-            sim_scores = []
-            for question, answer in chunk:
-                embeddings = model.encode([question, answer])
-                score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-                sim_scores.append(score)
-                all_scores.append(score)
-
-            avg_score = np.mean(sim_scores) if sim_scores else 0.0
-            results.append({
-                "progress": f"{(i + 1) * 10}%",
-                "score": round(avg_score * 100, 2)
-            })
+        # Only the pairs that fall into the 10 progress chunks are scored
+        chunk_size = max(1, len(qas) // 10)
+        qas = qas[:chunk_size * 10]
 
-        overall = round(np.mean(all_scores) * 100, 2) if all_scores else 0.0
+        scores = score_pairs([q for q, _ in qas], [a for _, a in qas])
+        results, overall = progress_buckets(scores)
 
         return {
             "scores": results,
@@ -68,22 +103,23 @@ def get_similarity_scores(transcript_path):
         }
 
 
+@timed("score.evaluate_qa_pairs")
 def evaluate_qa_pairs(qa_pairs):
     """
     Takes a list of Q&A dicts and returns an average cosine similarity score.
     Used to score an individual candidate's interview in /submit-interview.
     """
     try:
-        sim_scores = []
+        questions, answers = [], []
         for pair in qa_pairs:
             question = pair.get("question", "").strip()
             answer = pair.get("answer", "").strip()
             if question and answer:
-                embeddings = model.encode([question, answer])
-                score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-                sim_scores.append(score)
+                questions.append(question)
+                answers.append(answer)
 
-        overall = round(np.mean(sim_scores) * 100, 2) if sim_scores else 0.0
+        sim_scores = score_pairs(questions, answers)
+        overall = round(float(np.mean(sim_scores)) * 100, 2) if len(sim_scores) else 0.0
         return overall
 
     except Exception as e:
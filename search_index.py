@@ -0,0 +1,280 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+from vector_store import VectorStore, normalize_rows
+from metrics import span
+
+# Resumes are embedded once when they are uploaded and kept in one
+# memory-mapped float32 matrix, so "best candidates for this JD" is a single
+# matrix-vector product. Past SEARCH_IVF_MIN_ROWS resumes, queries only scan
+# the SEARCH_IVF_PROBES partitions closest to the query (set
+# SEARCH_IVF_MIN_ROWS=0 to always scan everything).
+SEARCH_DIR = os.getenv("SEARCH_DIR", os.path.join("data", "search"))
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+IVF_MIN_ROWS = int(os.getenv("SEARCH_IVF_MIN_ROWS", "100000"))
+IVF_LISTS = int(os.getenv("SEARCH_IVF_LISTS", "0"))  # 0: sqrt(number of resumes)
+IVF_PROBES = int(os.getenv("SEARCH_IVF_PROBES", "8"))
+IVF_REBUILD = 0.25  # repartition once this fraction of rows was added or rewritten since the last build
+IVF_TRAIN_PER_LIST = 64  # k-means sample size per partition
+ASSIGN_BLOCK = 16384  # rows per block when assigning the whole matrix to partitions
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    session_id TEXT,
+    jd_id TEXT,
+    name TEXT,
+    email TEXT,
+    position TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resumes_session ON resumes (session_id);
+"""
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first; argpartition keeps this O(n)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class IVFPartition:
+    """
+    Coarse partitioning of the resume matrix (spherical k-means centroids plus
+    the rows nearest to each). A query scores the centroids, then only the rows
+    of its `probes` closest partitions, any rows added since the build and any
+    older rows whose vectors were rewritten since (`dirty`, which may sit in
+    the wrong partition). Results are approximate: a good match in an
+    unprobed partition is missed.
+    """
+
+    def __init__(self, matrix, n_lists, generation=0, iterations=8, seed=0):
+        rng = np.random.default_rng(seed)
+        n = len(matrix)
+        self.built_rows = n
+        self.built_gen = generation  # the store's write generation the rows were read at
+        self.dirty = np.zeros(0, dtype=np.int64)
+        self.dirty_gen = generation
+        self.n_lists = n_lists = max(1, min(n_lists, n))
+
+        sample = np.sort(rng.choice(n, size=min(n, n_lists * IVF_TRAIN_PER_LIST), replace=False))
+        train = np.asarray(matrix[sample])
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=n_lists)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            # Empty partitions keep their previous centroid
+            centroids = centroids.copy()
+            centroids[filled] = normalize_rows(np.add.reduceat(train[order], starts, axis=0))
+        self.centroids = centroids
+
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, ASSIGN_BLOCK):
+            block = matrix[start:start + ASSIGN_BLOCK]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self.rows = np.argsort(assign, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=n_lists))))
+
+    def candidates(self, query, probes, total_rows):
+        nearest = top_k(self.centroids @ query, probes)
+        parts = [self.rows[self.offsets[c]:self.offsets[c + 1]] for c in nearest]
+        parts.append(np.arange(self.built_rows, total_rows, dtype=np.int64))
+        if len(self.dirty):
+            # A dirty row can also be in a probed partition; count it once
+            return np.unique(np.concatenate(parts + [self.dirty]))
+        return np.concatenate(parts)
+
+    def mark_dirty(self, rows, generation):
+        """Record the built rows written since the build, as of the store's `generation`."""
+        self.dirty = rows[rows < self.built_rows]
+        self.dirty_gen = generation
+
+
+class SearchIndex:
+    """
+    Resume embeddings keyed by the upload's content hash, with a little
+    metadata per resume (file name, latest session, the candidate's name once
+    an interview is submitted) for building search results.
+    """
+
+    def __init__(self, directory=SEARCH_DIR, dim=EMBEDDING_DIM, embed_fn=None, ivf_min_rows=IVF_MIN_ROWS,
+                 ivf_lists=IVF_LISTS, ivf_probes=IVF_PROBES):
+        self.directory = directory
+        self.db_path = os.path.join(directory, "resumes.sqlite3")
+        # embed_fn(list_of_texts) -> (n, dim) array; defaults to scorer.embed_texts
+        self.embed_fn = embed_fn
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.vectors = VectorStore(directory, "resumes", dim)
+        self._local = threading.local()
+        self._ivf = None
+        self._ivf_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def embed(self, texts):
+        embed_fn = self.embed_fn
+        if embed_fn is None:
+            from scorer import embed_texts
+            embed_fn = embed_texts
+        return np.asarray(embed_fn(list(texts)), dtype=np.float32)
+
+    # ---- indexing --------------------------------------------------------
+
+    def add_many(self, records, embeddings=None):
+        """
+        Index resumes given as dicts with id and text (plus optional filename,
+        session_id, jd_id). Texts are embedded in one batch unless `embeddings`
+        is passed; re-adding an id replaces its vector and metadata.
+        """
+        records = list(records)
+        if not records:
+            return []
+        if embeddings is None:
+            # The model reads roughly the first 256 tokens of each resume
+            embeddings = self.embed([r["text"] for r in records])
+        ids = [r["id"] for r in records]
+        with span("search.index"):
+            self.vectors.put_many(ids, embeddings)
+            now = time.time()
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO resumes (id, filename, session_id, jd_id, indexed_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET filename = excluded.filename,"
+                    " session_id = excluded.session_id, jd_id = excluded.jd_id, indexed_at = excluded.indexed_at",
+                    [(r["id"], r.get("filename"), r.get("session_id"), r.get("jd_id"), now) for r in records],
+                )
+        return ids
+
+    def add(self, resume_id, text, filename=None, session_id=None, jd_id=None):
+        return self.add_many([{"id": resume_id, "text": text, "filename": filename,
+                               "session_id": session_id, "jd_id": jd_id}])[0]
+
+    def annotate(self, session_id, name=None, email=None, position=None):
+        """Attach the candidate's details from a submitted interview to the session's resume."""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE resumes SET name = ?, email = ?, position = ? WHERE session_id = ?",
+                (name, email, position, session_id),
+            )
+
+    def remove(self, resume_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM resumes WHERE id = ?", (resume_id,))
+        return self.vectors.remove(resume_id)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    # ---- queries ---------------------------------------------------------
+
+    def _stale(self, ivf, n):
+        return (ivf is None or n < ivf.built_rows
+                or n + len(ivf.dirty) > ivf.built_rows * (1 + IVF_REBUILD))
+
+    def _partition(self, matrix, generation):
+        """
+        The current IVF partition for `matrix` (read at the store's write
+        `generation`), rebuilt once enough rows were added or rewritten.
+        """
+        n = len(matrix)
+        if not self.ivf_min_rows or n < self.ivf_min_rows:
+            return None
+        ivf = self._ivf
+        if ivf is not None and ivf.dirty_gen != generation:
+            # Only after a write: scanning the per-row generations is O(n), but in numpy
+            with self._ivf_lock:
+                if ivf.dirty_gen != generation:
+                    ivf.mark_dirty(self.vectors.written_since(ivf.built_gen), generation)
+        if self._stale(ivf, n):
+            with self._ivf_lock:
+                ivf = self._ivf
+                if self._stale(ivf, n):
+                    with span("search.ivf_build"):
+                        ivf = IVFPartition(matrix, self.ivf_lists or int(math.sqrt(n)), generation)
+                    self._ivf = ivf
+        return ivf
+
+    def search_vector(self, query, k=10, exact=False):
+        """
+        Top-k resumes by cosine similarity to `query`.
+        Returns (hits, scanned) where hits is [(resume_id, score)], best first.
+        """
+        query = normalize_rows(query)[0]
+        with span("search.query"):
+            # Read before the matrix, so a concurrent write counts as dirty rather than built
+            generation = self.vectors.generation()
+            ids, matrix, free = self.vectors.view()
+            ivf = None if exact else self._partition(matrix, generation)
+            if ivf is None:
+                rows = None
+                scores = matrix @ query
+            else:
+                rows = ivf.candidates(query, self.ivf_probes, len(matrix))
+                scores = matrix[rows] @ query
+            # Removed resumes leave zero rows behind; keep them out of the results
+            if free is not None:
+                scores[free if rows is None else free[rows]] = -np.inf
+            best = top_k(scores, k)
+            hits = [(ids[i if rows is None else rows[i]], float(scores[i]))
+                    for i in best if scores[i] > -np.inf]
+        return hits, len(scores)
+
+    def search_text(self, text, k=10, exact=False):
+        return self.search_vector(self.embed([text])[0], k, exact)
+
+    def details(self, resume_ids):
+        """Metadata rows for `resume_ids`, keyed by id."""
+        if not resume_ids:
+            return {}
+        placeholders = ",".join("?" * len(resume_ids))
+        rows = self._conn().execute(
+            f"SELECT * FROM resumes WHERE id IN ({placeholders})", list(resume_ids)
+        ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def results(self, hits):
+        """Search hits as result dicts: the resume's metadata plus its score."""
+        details = self.details([vid for vid, _ in hits])
+        return [dict(details.get(vid, {"id": vid}), score=round(score, 4)) for vid, score in hits]
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_search_index():
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                _default_index = SearchIndex()
+    return _default_index
@@ -0,0 +1,264 @@
+import os
+import json
+import shutil
+import time
+import uuid
+import sqlite3
+import threading
+
+from results_store import DEFAULT_DB_PATH
+from interview_history import InterviewHistory
+from transcript_log import TranscriptLog
+from metrics import span
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(2 * 3600)))
+SESSION_RETENTION = float(os.getenv("SESSION_RETENTION", str(7 * 24 * 3600)))
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", os.path.join("data", "sessions"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at);
+-- Answers are appended here instead of rewriting the session document;
+-- update() folds them back into the document
+CREATE TABLE IF NOT EXISTS session_answers (
+    session_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_answers_session ON session_answers (session_id);
+"""
+
+
+def _serialize(session):
+    doc = {k: v for k, v in session.items() if k != "interview"}
+    interview = session.get("interview")
+    if interview is not None:
+        doc["history"] = interview.to_list()
+    return json.dumps(doc)
+
+
+class SessionManager:
+    """
+    Interview state per session id, so concurrent candidates do not share
+    history and transcript files. session["interview"] is the session's
+    InterviewHistory; answers are persisted as appended rows, not rewrites.
+    Sessions are persisted in the results database (one row each, with a
+    version counter) and cached in memory; a cached copy is reused only while
+    its version still matches, so any gunicorn worker can serve any session.
+    Idle sessions fall out of memory after SESSION_TTL seconds.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, ttl=SESSION_TTL, retention=SESSION_RETENTION,
+                 sessions_dir=SESSIONS_DIR):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.retention = retention
+        self.sessions_dir = sessions_dir
+        self._cache = {}  # id -> (version, last_access, session)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def session_dir(self, session_id):
+        path = os.path.join(self.sessions_dir, session_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def transcript_log(self, session_id):
+        return TranscriptLog(os.path.join(self.session_dir(session_id), "transcript.jsonl"))
+
+    def _load(self, conn, session_id):
+        row = conn.execute("SELECT version, data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None, None
+        session = json.loads(row[1])
+        interview = InterviewHistory(session.get("history"))
+        for question_id, answer in conn.execute(
+            "SELECT question_id, answer FROM session_answers WHERE session_id = ? ORDER BY rowid",
+            (session_id,),
+        ):
+            interview.set_answer(question_id, answer)
+        session["interview"] = interview
+        return row[0], session
+
+    def _remember(self, session, version):
+        with self._lock:
+            self._cache[session["id"]] = (version, time.time(), session)
+
+    def create(self, **fields):
+        now = time.time()
+        session = {
+            "id": uuid.uuid4().hex,
+            "created_at": now,
+            "updated_at": now,
+            "interview": InterviewHistory(),
+        }
+        session.update(fields)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (id, version, data, updated_at) VALUES (?, 1, ?, ?)",
+                (session["id"], _serialize(session), now),
+            )
+        self._remember(session, 1)
+        self.evict_expired()
+        return session
+
+    def get(self, session_id):
+        """Return the session dict (treat it as read-only; change it via update())."""
+        if not session_id:
+            return None
+        row = self._conn().execute(
+            "SELECT version FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(session_id, None)
+            return None
+
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[0] == row[0]:
+                self._cache[session_id] = (cached[0], time.time(), cached[2])
+                return cached[2]
+
+        version, session = self._load(self._conn(), session_id)
+        if session is None:
+            return None
+        self._remember(session, version)
+        return session
+
+    def update(self, session_id, mutate):
+        """
+        Atomically apply mutate(session) and persist the result. Runs under a
+        write transaction, so concurrent updates from other workers serialize.
+        Returns mutate's return value.
+        """
+        conn = self._conn()
+        with span("session.update"), conn:
+            conn.execute("BEGIN IMMEDIATE")
+            version, session = self._load(conn, session_id)
+            if session is None:
+                raise KeyError(f"Unknown session: {session_id}")
+            result = mutate(session)
+            session["updated_at"] = time.time()
+            version += 1
+            # The document now carries every answer, so the appended rows can go
+            conn.execute("DELETE FROM session_answers WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "UPDATE sessions SET version = ?, data = ?, updated_at = ? WHERE id = ?",
+                (version, _serialize(session), session["updated_at"], session_id),
+            )
+            session["interview"].mark_clean()
+        self._remember(session, version)
+        return result
+
+    def record_answer(self, session_id, answer, question_id=None, question=None):
+        """
+        Save one answer by question id (or, for older clients, by question text).
+        Appends a single row and bumps the session version; the session
+        document itself is not rewritten. Returns the question id.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown session: {session_id}")
+            version = row[0]
+            with self._lock:
+                cached = self._cache.get(session_id)
+            if cached is not None and cached[0] == version:
+                session = cached[2]
+            else:
+                version, session = self._load(conn, session_id)
+
+            interview = session["interview"]
+            resolved = interview.resolve(question_id, question)
+            if resolved is None:
+                raise KeyError("Question not found in this interview")
+
+            now = time.time()
+            conn.execute(
+                "INSERT INTO session_answers (session_id, question_id, answer, answered_at) VALUES (?, ?, ?, ?)",
+                (session_id, resolved, answer, now),
+            )
+            conn.execute(
+                "UPDATE sessions SET version = ?, updated_at = ? WHERE id = ?",
+                (version + 1, now, session_id),
+            )
+            with self._lock:
+                interview.set_answer(resolved, answer)
+                session["updated_at"] = now
+        self._remember(session, version + 1)
+        return resolved
+
+    def delete(self, session_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.execute("DELETE FROM session_answers WHERE session_id = ?", (session_id,))
+        with self._lock:
+            self._cache.pop(session_id, None)
+        self._remove_files([session_id])
+
+    def _remove_files(self, session_ids):
+        # History and transcript files live in data/sessions/<id>/
+        for session_id in session_ids:
+            shutil.rmtree(os.path.join(self.sessions_dir, session_id), ignore_errors=True)
+
+    def evict_expired(self):
+        """Drop idle sessions from memory, and sessions past retention from the database."""
+        now = time.time()
+        with self._lock:
+            for session_id in [sid for sid, (_, seen, _) in self._cache.items() if now - seen > self.ttl]:
+                del self._cache[session_id]
+        if self.retention:
+            conn = self._conn()
+            with conn:
+                expired = [row[0] for row in conn.execute(
+                    "SELECT id FROM sessions WHERE updated_at < ?", (now - self.retention,)
+                ).fetchall()]
+                conn.executemany("DELETE FROM sessions WHERE id = ?", [(sid,) for sid in expired])
+                conn.execute(
+                    "DELETE FROM session_answers WHERE session_id NOT IN (SELECT id FROM sessions)"
+                )
+            self._remove_files(expired)
+
+    def stats(self):
+        with self._lock:
+            cached = len(self._cache)
+        total = self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"cached": cached, "stored": total, "ttl": self.ttl}
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_session_manager():
+    global _default_manager
+    if _default_manager is None:
+        with _default_lock:
+            if _default_manager is None:
+                _default_manager = SessionManager()
+    return _default_manager
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+from datetime import datetime
+
+from metrics import BYTES_WRITTEN
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on each record going out in a single append-mode write
+    fcntl = None
+
+ANSWER = "answer"
+SUBMISSION = "submission"
+
+
+class TranscriptLog:
+    """
+    Append-only JSON-lines transcript: one record per answer (plus one per
+    submitted interview). Each record carries its own byte offset, so readers can resume from a saved offset and only see new records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def append(self, record_type, **fields):
+        """Append one record and return it, including its offset."""
+        record = {"type": record_type, "ts": time.time()}
+        record.update(fields)
+        # Every append opens the file, so the flock serializes threads as well as processes
+        with open(self.path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                record["offset"] = offset
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                f.write(line + b"\n")
+                f.flush()
+                BYTES_WRITTEN.inc(len(line) + 1, kind="transcript")
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return record
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read_from(self, offset=0, record_type=None):
+        """
+        Records starting at byte `offset`. Returns (records, new_offset); a
+        partially written last line is left for the next read.
+        """
+        records = []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return records, offset
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                record = json.loads(line)
+                if record_type is None or record.get("type") == record_type:
+                    records.append(record)
+        return records, offset
+
+    def records(self, record_type=None):
+        return self.read_from(0, record_type)[0]
+
+    def render_text(self):
+        """Human-readable export of the whole log."""
+        lines = []
+        for record in self.records():
+            if record["type"] == ANSWER:
+                lines.append(f"Q: {record['question']}\nA: {record['answer']}\n")
+            elif record["type"] == SUBMISSION:
+                lines.append("=" * 80)
+                lines.append("INTERVIEW TRANSCRIPT")
+                lines.append(f"Candidate: {record.get('name')}")
+                lines.append(f"Email: {record.get('email')}")
+                lines.append(f"Position: {record.get('position')}")
+                lines.append(f"Overall Score: {round(record.get('score', 0) * 100, 1)}%")
+                lines.append(f"Interview Date: {datetime.fromtimestamp(record['ts']).strftime('%Y-%m-%d %H:%M:%S')}")
+                lines.append("=" * 80 + "\n")
+                for i, pair in enumerate(record.get("qa_pairs", []), 1):
+                    lines.append(f"Question {i}: {pair['question']}")
+                    lines.append(f"Answer {i}: {pair['answer']}")
+                    lines.append("-" * 40)
+                lines.append("\n" + "=" * 80 + "\n")
+        return "\n".join(lines)
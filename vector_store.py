@@ -0,0 +1,363 @@
+import os
+import json
+import uuid
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process are still serialized by _lock
+    fcntl = None
+
+INITIAL_CAPACITY = 64
+COMPACT_BYTES = 1 << 20  # rewrite the index once its change log outgrows this and the index itself
+
+
+def normalize_rows(vectors):
+    """float32 copy of `vectors` with every row scaled to unit length (zero rows stay zero)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class VectorStore:
+    """
+    Unit-length float32 vectors keyed by id, kept in one contiguous
+    memory-mapped matrix (<name>.f32) with a JSON id index (<name>.json).
+    Similarity against any set of rows is a single matrix product.
+
+    Writers take a file lock and append the rows they changed to a change log
+    (<name>.<log>.log) named by the index; readers in other processes replay
+    new log lines on their next call. Once the log outgrows the index, the
+    writer compacts both into a fresh index with an empty log.
+    Every write bumps a generation counter and stamps the rows it wrote with
+    it in a shared int64 file (<name>.gen), so callers with their own per-row
+    structures can find changed rows.
+    """
+
+    def __init__(self, directory, name, dim):
+        self.directory = directory
+        self.name = name
+        self.dim = dim
+        self.matrix_path = os.path.join(directory, f"{name}.f32")
+        self.written_path = os.path.join(directory, f"{name}.gen")
+        self.index_path = os.path.join(directory, f"{name}.json")
+        self._lock = threading.RLock()
+        self._index_stamp = None
+        self._index_size = 0
+        self._log_path = None  # change log named by the index; None before the first write
+        self._log_offset = 0   # bytes of the log already applied
+        self._ids = []         # row -> id (None for a free row); only appended to once published
+        self._rows = {}        # id -> row
+        self._free = np.zeros(0, dtype=bool)  # row -> True when free, sized to capacity
+        self._gen = 0          # write generation
+        self._written = np.zeros(0, dtype=np.int64)  # row -> generation of its last write
+        self._capacity = 0
+        self._matrix = None
+        self._locked = False   # True while this store's holder of _lock also holds the file lock
+        os.makedirs(directory, exist_ok=True)
+
+    # ---- index / mapping -------------------------------------------------
+
+    def _stat_index(self):
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None, 0
+        return (st.st_ino, st.st_mtime_ns), st.st_size  # os.replace gives every index a new inode
+
+    def _sync(self):
+        """Reload the index if it was compacted, then apply log lines written since the last call."""
+        while True:
+            stamp, size = self._stat_index()
+            if stamp != self._index_stamp or (self._matrix is None and stamp is not None):
+                self._load(stamp, size)
+            if self._log_path is None:
+                return
+            try:
+                with open(self._log_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == self._log_offset:
+                        return
+                    f.seek(self._log_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                # Compacted between the stat and the open: the new index holds every change
+                if self._stat_index()[0] != stamp:
+                    continue
+                return
+            end = data.rfind(b"\n") + 1  # a writer may still be appending the last line
+            for line in data[:end].splitlines():
+                self._apply(json.loads(line))
+            self._log_offset += end
+            return
+
+    def _load(self, stamp, size):
+        self._index_stamp, self._index_size = stamp, size
+        self._log_path, self._log_offset = None, 0
+        if stamp is None:
+            self._ids, self._rows, self._capacity, self._matrix = [], {}, 0, None
+            self._free = np.zeros(0, dtype=bool)
+            self._gen, self._written = 0, np.zeros(0, dtype=np.int64)
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["dim"] != self.dim:
+            raise ValueError(f"{self.index_path} holds {index['dim']}-dim vectors, expected {self.dim}")
+        self._ids = index["ids"]
+        self._rows = {vid: row for row, vid in enumerate(self._ids) if vid is not None}
+        self._gen = index.get("gen", 0)
+        self._free = np.zeros(index["capacity"], dtype=bool)
+        self._free[:len(self._ids)] = [vid is None for vid in self._ids]
+        if index.get("log"):
+            self._log_path = os.path.join(self.directory, f"{self.name}.{index['log']}.log")
+            self._map(index["capacity"])
+        else:
+            # Indexes written before the change log have no generations file: every row
+            # counts as generation 0 until the first write compacts them into the new layout
+            self._capacity = index["capacity"]
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                     shape=(self._capacity, self.dim))
+            self._written = np.zeros(self._capacity, dtype=np.int64)
+
+    def _map(self, capacity, grow=False):
+        """Map the matrix and row generations at `capacity` rows; writers pass grow=True to extend the files."""
+        if grow:
+            # Extending the files keeps existing rows in place; only the mapping changes
+            for path, row_bytes in ((self.matrix_path, self.dim * 4), (self.written_path, 8)):
+                with open(path, "ab") as f:
+                    if f.tell() < capacity * row_bytes:
+                        f.truncate(capacity * row_bytes)
+        self._capacity = capacity
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                 shape=(capacity, self.dim))
+        self._written = np.memmap(self.written_path, dtype=np.int64, mode="r+", shape=(capacity,))
+        if len(self._free) < capacity:
+            free = np.zeros(capacity, dtype=bool)
+            free[:len(self._free)] = self._free
+            self._free = free
+
+    def _apply(self, record):
+        """Apply one change-log record: rows it assigned ids to (None for freed rows)."""
+        if record["capacity"] > self._capacity:
+            self._map(record["capacity"])
+        self._gen = record["gen"]
+        ids, free = self._ids, self._free
+        if any(row < len(ids) and ids[row] != vid for row, vid in record["rows"]):
+            # Callers of view() may still hold these; appended rows are past their end
+            ids, free = list(ids), free.copy()
+        for row, vid in record["rows"]:
+            if row < len(ids):
+                old = ids[row]
+                if old is not None and self._rows.get(old) == row:
+                    del self._rows[old]
+                ids[row] = vid
+            else:
+                free[len(ids):row] = True
+                ids.extend([None] * (row - len(ids)))
+                ids.append(vid)
+            free[row] = vid is None
+            if vid is not None:
+                self._rows[vid] = row
+        self._ids, self._free = ids, free
+
+    def _compact(self):
+        """Rewrite the index with every change so far and start an empty change log."""
+        log = uuid.uuid4().hex[:12]
+        log_path = os.path.join(self.directory, f"{self.name}.{log}.log")
+        open(log_path, "wb").close()
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "capacity": self._capacity, "ids": self._ids,
+                       "gen": self._gen, "log": log}, f)
+        os.replace(tmp, self.index_path)
+        self._index_stamp, self._index_size = self._stat_index()
+        if self._log_path is not None:
+            try:
+                os.remove(self._log_path)
+            except OSError:  # Windows keeps files open by readers
+                pass
+        self._log_path, self._log_offset = log_path, 0
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the thread and file locks, e.g. to check-then-write across several
+        calls; writes made inside by the same thread do not lock again.
+        """
+        with self._lock:
+            if self._locked:
+                yield
+                return
+            with open(os.path.join(self.directory, f"{self.name}.lock"), "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self._locked = True
+                try:
+                    yield
+                finally:
+                    self._locked = False
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write(self, apply):
+        """Run `apply()` under the thread and file locks with an up-to-date index."""
+        with self.locked():
+            self._sync()
+            return apply()
+
+    def _commit(self, changes):
+        """
+        Publish rows whose vectors apply() already wrote: stamp their
+        generation, then append [(row, id)] to the change log, or compact.
+        """
+        rows = [row for row, _ in changes]
+        self._matrix.flush()
+        self._gen += 1
+        if not isinstance(self._written, np.memmap):
+            self._map(self._capacity, grow=True)  # first write since an index without a generations file
+        self._written[rows] = self._gen
+        self._written.flush()
+        self._apply({"gen": self._gen, "capacity": self._capacity, "rows": changes})
+        if self._log_path is None or self._log_offset > max(COMPACT_BYTES, self._index_size):
+            self._compact()
+            return
+        line = (json.dumps({"gen": self._gen, "capacity": self._capacity,
+                            "rows": changes}) + "\n").encode("utf-8")
+        with open(self._log_path, "r+b") as f:
+            f.truncate(self._log_offset)  # drop a line left half-written by a crashed writer
+            f.seek(self._log_offset)
+            f.write(line)
+        self._log_offset += len(line)
+
+    # ---- writes ----------------------------------------------------------
+
+    def put_many(self, ids, vectors):
+        """Insert or overwrite vectors for `ids`; returns their rows."""
+        ids = list(ids)
+        vectors = normalize_rows(vectors)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected {len(ids)} vectors of dimension {self.dim}, got {vectors.shape}")
+
+        def apply():
+            used = len(self._ids)
+            free = np.flatnonzero(self._free[:used])[::-1].tolist() if used > len(self._rows) else []
+            rows, added = [], {}
+            for vid in ids:
+                row = self._rows.get(vid, added.get(vid))
+                if row is None:
+                    if free:
+                        row = free.pop()
+                    else:
+                        row, used = used, used + 1
+                    added[vid] = row
+                rows.append(row)
+            if used > self._capacity:
+                capacity = max(INITIAL_CAPACITY, self._capacity)
+                while capacity < used:
+                    capacity *= 2
+                self._map(capacity, grow=True)
+            self._matrix[rows] = vectors
+            self._commit(list(zip(rows, ids)))
+            return rows
+
+        return self._write(apply)
+
+    def put(self, vid, vector):
+        return self.put_many([vid], [vector])[0]
+
+    def remove(self, vid):
+        """Free the row for `vid`; returns False if it was not stored."""
+        def apply():
+            row = self._rows.get(vid)
+            if row is None:
+                return False
+            self._matrix[row] = 0.0
+            self._commit([(row, None)])
+            return True
+
+        return self._write(apply)
+
+    # ---- reads -----------------------------------------------------------
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._rows)
+
+    def __contains__(self, vid):
+        with self._lock:
+            self._sync()
+            return vid in self._rows
+
+    def ids(self):
+        with self._lock:
+            self._sync()
+            return list(self._rows)
+
+    def get(self, vid):
+        """Copy of the stored (unit-length) vector, or None."""
+        with self._lock:
+            self._sync()
+            row = self._rows.get(vid)
+            return None if row is None else np.array(self._matrix[row])
+
+    def rows_for(self, ids):
+        """Row numbers for `ids`; raises KeyError naming the first unknown id."""
+        with self._lock:
+            self._sync()
+            try:
+                return np.fromiter((self._rows[vid] for vid in ids), dtype=np.int64, count=len(ids))
+            except KeyError as e:
+                raise KeyError(f"No vector stored for {e.args[0]!r}") from None
+
+    def similarities(self, ids, vectors):
+        """Cosine similarity of vectors[i] to the stored vector for ids[i], in one pass."""
+        ids = list(ids)
+        queries = normalize_rows(vectors)
+        with self._lock:
+            rows = self.rows_for(ids)
+            stored = self._matrix[rows]
+        return np.einsum("ij,ij->i", stored, queries)
+
+    def snapshot(self):
+        """(ids, matrix) for every stored vector; the matrix is a view of the mapping when no rows are free."""
+        with self._lock:
+            self._sync()
+            if not self._rows:
+                return [], np.zeros((0, self.dim), dtype=np.float32)
+            used = len(self._ids)
+            live = [row for row in range(used) if self._ids[row] is not None]
+            if len(live) == used:
+                matrix = self._matrix[:used]   # contiguous: no copy
+            else:
+                matrix = self._matrix[live]
+            return [self._ids[row] for row in live], matrix
+
+    def view(self):
+        """
+        (ids_by_row, matrix, free) over every used row without copying; free
+        rows have id None, a zero vector and True in the `free` mask (None when
+        no row is free). ids_by_row is shared and must not be modified. Row
+        numbers stay stable until a row is freed and reused, so callers can keep
+        their own per-row structures and check written_since() for changes.
+        """
+        with self._lock:
+            self._sync()
+            used = len(self._ids)
+            if used == 0:
+                return [], np.zeros((0, self.dim), dtype=np.float32), None
+            return self._ids, self._matrix[:used], self._free[:used] if used > len(self._rows) else None
+
+    def generation(self):
+        """Counter bumped by every write, in any process."""
+        with self._lock:
+            self._sync()
+            return self._gen
+
+    def written_since(self, generation):
+        """Rows written or freed after `generation`, in row order."""
+        with self._lock:
+            self._sync()
+            return np.flatnonzero(self._written > generation)
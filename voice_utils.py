@@ -1,26 +1,215 @@
 # voice_utils.py
 import os
+import time
 import wave
+import sqlite3
+import threading
+from typing import Tuple
 import numpy as np
 import webrtcvad
 from resemblyzer import VoiceEncoder, preprocess_wav
 from scipy.spatial.distance import cosine
 
-# Where to store enrolled embeddings:
+from vector_store import VectorStore
+
+# Where to store enrolled embeddings: one matrix for every speaker, keyed by
+# candidate/session id. The single-speaker .npy files are imported once.
 ENROLLED_EMB_PATH = os.path.join("data", "enrolled_embedding.npy")
-# We’ll also track a “dissimilar voice counter” in memory per session
-# (for simplicity, store it here; in production you’d tie it to a user session ID)
-VOICE_MISMATCH_DURATION = 0.0  # in seconds
+ENROLLED_DIR = os.path.join("data", "enrolled")
+MISMATCH_DB_PATH = os.path.join("data", "voice.sqlite3")
+EMBEDDING_DIM = 256
+DEFAULT_SPEAKER = "default"
 MISMATCH_THRESHOLD = 10.0      # trigger alert after 10 seconds of mismatch
+VAD_FRAME_MS = 20              # webrtcvad accepts 10, 20 or 30 ms frames
+VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)  # the only rates webrtcvad accepts
+SILENCE_RMS = 100.0            # int16 RMS (about -50 dBFS); quieter frames skip webrtcvad
+SPEECH_PAD_MS = 100            # audio kept around each run of speech frames
+
+# Resemblyzer’s encoder is loaded once per process and shared by every VoiceUtils
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_voice_encoder() -> VoiceEncoder:
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = VoiceEncoder()
+    return _encoder
+
+
+_enrollments = None
+_enrollments_lock = threading.Lock()
+
+
+def get_enrollment_store() -> VectorStore:
+    """Process-wide store of enrolled speaker embeddings."""
+    global _enrollments
+    if _enrollments is None:
+        with _enrollments_lock:
+            if _enrollments is None:
+                store = VectorStore(ENROLLED_DIR, "speakers", EMBEDDING_DIM)
+                _import_legacy_enrollments(store)
+                _enrollments = store
+    return _enrollments
+
+
+def _import_legacy_enrollments(store: VectorStore):
+    """Move per-speaker .npy files (and the old single-speaker file) into the store."""
+    # Every worker calls this; under the store's lock only the first one finds files to move
+    with store.locked():
+        legacy = [(DEFAULT_SPEAKER, ENROLLED_EMB_PATH)]
+        legacy += [(name[:-4], os.path.join(ENROLLED_DIR, name))
+                   for name in sorted(os.listdir(ENROLLED_DIR)) if name.endswith(".npy")]
+        legacy = [(sid, path) for sid, path in legacy if os.path.exists(path)]
+        if not legacy:
+            return
+        store.put_many([sid for sid, _ in legacy], [np.load(path) for _, path in legacy])
+        for _, path in legacy:
+            os.replace(path, path + ".imported")
+
+
+class MismatchTracker:
+    """
+    Seconds of consecutive non-matching speech, per session. Kept in SQLite so
+    every gunicorn worker adds to the same total, whichever one gets the chunk.
+    """
+
+    def __init__(self, db_path: str = MISMATCH_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mismatches ("
+            " session_id TEXT PRIMARY KEY, seconds REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork (gunicorn preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id: str) -> float:
+        row = self._conn().execute(
+            "SELECT seconds FROM mismatches WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def update_many(self, session_ids, matched, seconds) -> list:
+        """update() for several sessions in one transaction; returns the new totals."""
+        now = time.time()
+        conn = self._conn()
+        totals = []
+        with conn:
+            for sid, ok, secs in zip(session_ids, matched, seconds):
+                if ok:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO mismatches (session_id, seconds, updated_at) VALUES (?, 0, ?)",
+                        (sid, now),
+                    )
+                    totals.append(0.0)
+                    continue
+                conn.execute(
+                    "INSERT INTO mismatches (session_id, seconds, updated_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT (session_id) DO UPDATE SET seconds = seconds + excluded.seconds,"
+                    " updated_at = excluded.updated_at",
+                    (sid, float(secs), now),
+                )
+                totals.append(conn.execute(
+                    "SELECT seconds FROM mismatches WHERE session_id = ?", (sid,)
+                ).fetchone()[0])
+        return totals
+
+    def update(self, session_id: str, matched: bool, seconds: float) -> float:
+        """Reset on a match, otherwise add `seconds`; returns the new total."""
+        return self.update_many([session_id], [matched], [seconds])[0]
+
+    def drop(self, session_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM mismatches WHERE session_id = ?", (session_id,))
+
+
+_mismatches = None
+_mismatches_lock = threading.Lock()
+
+
+def get_mismatch_tracker() -> MismatchTracker:
+    global _mismatches
+    if _mismatches is None:
+        with _mismatches_lock:
+            if _mismatches is None:
+                _mismatches = MismatchTracker()
+    return _mismatches
+
+
+def pcm_view(buffer) -> np.ndarray:
+    """
+    View raw 16-bit PCM as an int16 array. bytes, bytearray, memoryview and
+    NumPy arrays are all wrapped without copying; a trailing odd byte is ignored.
+    """
+    if isinstance(buffer, np.ndarray):
+        return buffer if buffer.dtype == np.int16 else buffer.astype(np.int16)
+    view = memoryview(buffer).cast("B")
+    return np.frombuffer(view[:len(view) - len(view) % 2], dtype=np.int16)
+
+
+class AudioChunk:
+    """
+    One decoded WAV chunk: the raw PCM bytes (for VAD), the samples as an
+    int16 array (for the embedding) and its duration. Decoded exactly once.
+    """
+
+    def __init__(self, pcm_bytes: bytes, sample_rate: int, channels: int = 1):
+        samples = np.frombuffer(pcm_bytes, dtype=np.int16)
+        if channels > 1:
+            # Down-mix to mono; VAD and the encoder both expect a single channel
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            pcm_bytes = samples.tobytes()
+        self.pcm_bytes = pcm_bytes
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.duration = len(samples) / float(sample_rate) if sample_rate else 0.0
+
+    @classmethod
+    def from_pcm(cls, buffer, sample_rate: int = 16000) -> "AudioChunk":
+        """Wrap raw 16-bit mono PCM (bytes, memoryview or int16 array) without copying."""
+        chunk = cls.__new__(cls)
+        chunk.samples = pcm_view(buffer)
+        # A byte view: the array's own .data is int16-typed, so its len() is the sample count
+        chunk.pcm_bytes = memoryview(chunk.samples).cast("B")
+        chunk.sample_rate = sample_rate
+        chunk.duration = len(chunk.samples) / float(sample_rate)
+        return chunk
+
+    @classmethod
+    def from_wav(cls, wav_path: str) -> "AudioChunk":
+        with wave.open(wav_path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError("Expected 16-bit PCM WAV audio")
+            return cls(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels())
+
 
 class VoiceUtils:
-    def _init_(self):
-        # Initialize Resemblyzer’s pre‐built speaker encoder
-        self.encoder = VoiceEncoder()
+    def __init__(self):
+        # Resemblyzer’s pre‐built speaker encoder, shared across instances
+        self.encoder = get_voice_encoder()
 
         # Initialize a simple frame‐based VAD (mode=1: low aggressiveness)
         self.vad = webrtcvad.Vad(1)
 
+        # Enrolled embeddings for every speaker, and mismatch time per session
+        self.enrollments = get_enrollment_store()
+        self.mismatches = get_mismatch_tracker()
+
     def _read_wav(self, wav_path: str) -> np.ndarray:
         """
         Load a wav file, resample to 16 kHz mono if needed, and return waveform array.
@@ -34,50 +223,116 @@ class VoiceUtils:
         """
         return self.encoder.embed_utterance(wav_np)
 
-    def enroll_user(self, wav_path: str) -> np.ndarray:
+    def enroll_pcm(self, buffer, sample_rate: int = 16000, speaker_id: str = None) -> np.ndarray:
+        """Enroll from an in-memory 16-bit PCM buffer instead of a WAV file."""
+        emb = self.chunk_to_embedding(AudioChunk.from_pcm(buffer, sample_rate))
+        self.enrollments.put(speaker_id or DEFAULT_SPEAKER, emb)
+        return emb
+
+    def enroll_user(self, wav_path: str, speaker_id: str = None) -> np.ndarray:
         """
         Read a 10–15 sec WAV (16 kHz mono), extract a single averaged embedding,
-        and save it to disk so future chunks can be compared.
+        and store it so future chunks can be compared.
         """
         wav = self._read_wav(wav_path)
         # Resemblyzer’s embed_utterance() will average across the whole file:
         emb = self.extract_embedding(wav)
-        # Save to disk:
-        np.save(ENROLLED_EMB_PATH, emb)
+        self.enrollments.put(speaker_id or DEFAULT_SPEAKER, emb)
         return emb
 
-    def load_enrolled_embedding(self) -> np.ndarray:
+    def load_enrolled_embedding(self, speaker_id: str = None) -> np.ndarray:
         """
-        Load previously‐saved embedding. Raise if not found.
+        Return the enrolled (unit-length) embedding for a speaker.
+        Raise if not found.
         """
-        if not os.path.exists(ENROLLED_EMB_PATH):
-            raise FileNotFoundError("No enrolled voice embedding found. Register first.")
-        return np.load(ENROLLED_EMB_PATH)
+        emb = self.enrollments.get(speaker_id or DEFAULT_SPEAKER)
+        if emb is None:
+            raise KeyError(f"No enrolled voice embedding for {speaker_id or DEFAULT_SPEAKER!r}. Register first.")
+        return emb
+
+    def forget_speaker(self, speaker_id: str = None):
+        """Remove a speaker’s enrollment and reset their mismatch time."""
+        self.enrollments.remove(speaker_id or DEFAULT_SPEAKER)
+        self.mismatches.drop(speaker_id or DEFAULT_SPEAKER)
+
+    def speech_frames(
+        self,
+        pcm,
+        sample_rate: int = 16000,
+        frame_ms: int = VAD_FRAME_MS,
+        first_only: bool = False
+    ) -> np.ndarray:
+        """
+        Per-frame speech flags for 16-bit mono PCM (bytes, memoryview or int16 array).
+        The buffer is reshaped into frames without copying; an RMS pre-gate
+        drops silent frames in one vectorized pass, and only the rest go to
+        webrtcvad. With first_only, stop at (and keep only) the first speech frame.
+        """
+        samples = pcm_view(pcm)
+        frame_len = sample_rate * frame_ms // 1000
+        n_frames = len(samples) // frame_len
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+        # Squares summed in int64 (int16 squares would overflow); einsum casts in
+        # small buffered blocks, so no float copy of the whole buffer is made
+        energy = np.einsum("ij,ij->i", frames, frames, dtype=np.int64)
+        rms = np.sqrt(energy / frame_len)
+        voiced = rms >= SILENCE_RMS
+        for i in np.flatnonzero(voiced):
+            # webrtcvad only takes bytes, so candidate frames are the only ones copied
+            voiced[i] = self.vad.is_speech(frames[i].tobytes(), sample_rate)
+            if first_only and voiced[i]:
+                voiced[i + 1:] = False
+                break
+        return voiced
+
+    def speech_segments(
+        self,
+        pcm,
+        sample_rate: int = 16000,
+        frame_ms: int = VAD_FRAME_MS,
+        pad_ms: int = SPEECH_PAD_MS
+    ) -> list:
+        """
+        [(start_sample, end_sample), ...] spans of speech. Each run of speech
+        frames is widened by pad_ms on both sides, which also merges short pauses.
+        """
+        voiced = self.speech_frames(pcm, sample_rate, frame_ms)
+        if not voiced.any():
+            return []
+        pad = pad_ms // frame_ms
+        if pad:
+            window = np.ones(2 * pad + 1)
+            voiced = np.convolve(voiced, window, "full")[pad:pad + len(voiced)] > 0
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+        frame_len = sample_rate * frame_ms // 1000
+        return [(int(start) * frame_len, int(end) * frame_len)
+                for start, end in zip(edges[::2], edges[1::2])]
 
     def is_speech(self, pcm_bytes: bytes, sample_rate: int = 16000) -> bool:
         """
         Run WebRTC VAD on raw PCM bytes. Return True if speech is detected in this chunk.
         We expect pcm_bytes to be 16-bit mono PCM at 16 kHz.
         """
-        # We’ll split the bytes into 20 ms frames (frame_length = sample_rate * 0.02 * 2 bytes/sample)
-        frame_duration = 20  # milliseconds
-        bytes_per_frame = int(sample_rate * (frame_duration / 1000.0) * 2)
-        if len(pcm_bytes) < bytes_per_frame:
-            return False
-
-        # Check each frame; if any frame is “speech” → return True
-        for i in range(0, len(pcm_bytes) - bytes_per_frame + 1, bytes_per_frame):
-            frame = pcm_bytes[i:i + bytes_per_frame]
-            if self.vad.is_speech(frame, sample_rate):
-                return True
-        return False
+        return bool(self.speech_frames(pcm_bytes, sample_rate, first_only=True).any())
 
-    def chunk_to_embedding(self, wav_path: str) -> np.ndarray:
+    def chunk_to_embedding(self, chunk, segments: list = None) -> np.ndarray:
         """
-        Given a short WAV file path (2–5 sec), return its speaker embedding.
-        Internally uses preprocess_wav to load and downsample.
+        Given a short chunk (2–5 sec), return its speaker embedding.
+        Accepts an already-decoded AudioChunk, or a WAV file path. For an
+        AudioChunk only its speech spans (`segments`, found here if not given)
+        are embedded; a chunk with no detected speech is embedded whole.
         """
-        wav = self._read_wav(wav_path)
+        if isinstance(chunk, AudioChunk):
+            if segments is None:
+                segments = self.speech_segments(chunk.samples, chunk.sample_rate)
+            samples = chunk.samples
+            if segments:
+                samples = np.concatenate([samples[start:end] for start, end in segments])
+            # Resample/normalize the in-memory samples; no second file read
+            wav = preprocess_wav(samples.astype(np.float32) / 32768.0, source_sr=chunk.sample_rate)
+        else:
+            wav = self._read_wav(chunk)
         return self.extract_embedding(wav)
 
     def compare_embeddings(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
@@ -88,48 +343,51 @@ class VoiceUtils:
         sim = 1.0 - cosine(emb1, emb2)
         return max(0.0, sim)
 
+    def verify(self, speaker_ids, embeddings) -> np.ndarray:
+        """
+        Similarity of embeddings[i] to speaker_ids[i]’s enrollment, clamped at 0.
+        One lookup and one product for any number of concurrent interviews.
+        """
+        return np.maximum(self.enrollments.similarities(speaker_ids, embeddings), 0.0)
+
+    def track_many(self, session_ids, embeddings, seconds, sim_threshold: float = 0.75) -> list:
+        """
+        Verify one speech chunk per session in a single pass and update each
+        session’s mismatch time. `seconds` is the chunk length (scalar or per session).
+        Returns [(similarity, mismatch_seconds, trigger_alert_flag), ...].
+        """
+        sims = self.verify(session_ids, embeddings)
+        seconds = np.broadcast_to(np.asarray(seconds, dtype=np.float64), sims.shape)
+        totals = self.mismatches.update_many(session_ids, (sims >= sim_threshold).tolist(), seconds.tolist())
+        return [(float(sim), total, total >= MISMATCH_THRESHOLD) for sim, total in zip(sims, totals)]
+
     def process_chunk(
         self,
         chunk_wav_path: str,
-        last_aggregated: float,
+        *,
+        session_id: str = None,
         sim_threshold: float = 0.75
-    ) -> (float, bool):
+    ) -> Tuple[float, bool]:
         """
-        Process one short chunk:
-         1. Check if speech is present using VAD.
-         2. If speech → extract embedding and compare to enrolled.
-         3. If similarity < sim_threshold → accumulate mismatch time.
-         4. Otherwise reset mismatch accumulation.
+        Process one short chunk for a session (whose id is also its speaker id):
+         1. Find the speech spans using VAD.
+         2. If speech → embed just those spans and compare to enrolled.
+         3. If similarity < sim_threshold → accumulate the session’s mismatch time.
+         4. Otherwise reset it.
+        The WAV is decoded once and the same samples feed all three steps.
         Returns: (new_mismatch_accumulated_seconds, trigger_alert_flag)
         """
-        rms_speech = False
-        # Read raw PCM to feed VAD:
-        with wave.open(chunk_wav_path, 'rb') as wf:
-            sample_rate = wf.getframerate()
-            pcm_bytes = wf.readframes(wf.getnframes())
-
-        # Check if this chunk contains speech:
-        if self.is_speech(pcm_bytes, sample_rate=sample_rate):
-            rms_speech = True
-
-        if not rms_speech:
-            # No speech → do not change mismatch timer; no alert
-            return last_aggregated, False
-
-        # Extract embeddings:
-        enrolled_emb = self.load_enrolled_embedding()
-        chunk_emb = self.chunk_to_embedding(chunk_wav_path)
-        sim = self.compare_embeddings(enrolled_emb, chunk_emb)
-
-        if sim < sim_threshold:
-            # Mismatch. Add chunk length (in seconds) to accumulated mismatch:
-            duration_secs = wav_duration(chunk_wav_path)
-            new_acc = last_aggregated + duration_secs
-            trigger = new_acc >= MISMATCH_THRESHOLD
-            return new_acc, trigger
-        else:
-            # Reset on good match
-            return 0.0, False
+        session_id = session_id or DEFAULT_SPEAKER
+        chunk = AudioChunk.from_wav(chunk_wav_path)
+
+        # No speech → do not change mismatch timer; no alert
+        segments = self.speech_segments(chunk.samples, chunk.sample_rate)
+        if not segments:
+            return self.mismatches.get(session_id), False
+
+        chunk_emb = self.chunk_to_embedding(chunk, segments)
+        _, total, trigger = self.track_many([session_id], [chunk_emb], chunk.duration, sim_threshold)[0]
+        return total, trigger
 
 def wav_duration(wav_path: str) -> float:
     """
@@ -139,3 +397,134 @@ def wav_duration(wav_path: str) -> float:
         frames = wf.getnframes()
         rate = wf.getframerate()
         return frames / float(rate)
+
+
+class VoiceStream:
+    """
+    Streaming speaker verification for one interview session.
+    Raw 16 kHz PCM is fed in arbitrary-sized pieces and kept in a rolling
+    window; every `hop_seconds` of new audio the window is checked against the
+    enrolled speaker, and an event is returned. Nothing touches the disk.
+    """
+
+    def __init__(self, voice: "VoiceUtils", speaker_id: str = DEFAULT_SPEAKER, sample_rate: int = 16000,
+                 window_seconds: float = 3.0, hop_seconds: float = 1.0, sim_threshold: float = 0.75):
+        self.voice = voice
+        self.speaker_id = speaker_id
+        self.sample_rate = sample_rate
+        self.sim_threshold = sim_threshold
+        self.window = np.zeros(int(window_seconds * sample_rate), dtype=np.int16)
+        self.hop = int(hop_seconds * sample_rate)
+        self.filled = 0           # samples currently valid in the window
+        self.since_check = 0      # samples received since the last check
+        self.total_samples = 0
+        self.alerted = False
+        self.last_seen = time.time()
+        self._partial = b""       # odd byte carried over between feeds
+        self._lock = threading.Lock()
+
+    def feed(self, buffer) -> list:
+        """Append PCM audio; returns the events produced by any completed hops."""
+        with self._lock:
+            self.last_seen = time.time()
+            if self._partial or len(memoryview(buffer).cast("B")) % 2:
+                data = self._partial + bytes(buffer)
+                self._partial = data[len(data) - len(data) % 2:]
+                samples = pcm_view(data)
+            else:
+                samples = pcm_view(buffer)
+
+            events = []
+            while len(samples):
+                take = min(len(samples), self.hop - self.since_check)
+                self._push(samples[:take])
+                samples = samples[take:]
+                self.since_check += take
+                self.total_samples += take
+                if self.since_check >= self.hop:
+                    self.since_check = 0
+                    events.append(self._check())
+            return events
+
+    def _push(self, samples: np.ndarray):
+        n = len(samples)
+        size = len(self.window)
+        if n >= size:
+            self.window[:] = samples[-size:]
+            self.filled = size
+            return
+        # Shift left in place and append at the end
+        self.window[:size - n] = self.window[n:]
+        self.window[size - n:] = samples
+        self.filled = min(size, self.filled + n)
+
+    def _check(self) -> dict:
+        audio = self.window[len(self.window) - self.filled:]
+        chunk = AudioChunk.from_pcm(audio, self.sample_rate)
+        hop_seconds = self.hop / float(self.sample_rate)
+        event = {
+            "t": round(self.total_samples / float(self.sample_rate), 3),
+            "speech": False,
+            "similarity": None,
+        }
+        mismatch = self.voice.mismatches.get(self.speaker_id)
+        alert = False
+        segments = self.voice.speech_segments(chunk.samples, self.sample_rate)
+        if segments:
+            event["speech"] = True
+            emb = self.voice.chunk_to_embedding(chunk, segments)
+            sim, mismatch, alert = self.voice.track_many(
+                [self.speaker_id], [emb], hop_seconds, self.sim_threshold)[0]
+            event["similarity"] = round(sim, 4)
+            if not mismatch:
+                self.alerted = False
+        # Alert once per mismatch episode, not on every hop after the threshold
+        event["alert"] = alert and not self.alerted
+        self.alerted = self.alerted or alert
+        event["mismatch_seconds"] = round(mismatch, 3)
+        return event
+
+
+class VoiceStreams:
+    """Active VoiceStreams by session id; idle streams are dropped after `ttl` seconds."""
+
+    def __init__(self, ttl: float = 900.0):
+        self.ttl = ttl
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._voice = None
+
+    def voice(self) -> "VoiceUtils":
+        with self._lock:
+            if self._voice is None:
+                self._voice = VoiceUtils()
+            return self._voice
+
+    def get(self, session_id: str, **options) -> VoiceStream:
+        """The session's stream; a different sample_rate than before starts a new one."""
+        voice = self.voice()
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, st in self._streams.items() if now - st.last_seen > self.ttl]:
+                del self._streams[sid]
+                voice.mismatches.drop(sid)
+            stream = self._streams.get(session_id)
+            if stream is not None and stream.sample_rate != options.get("sample_rate", stream.sample_rate):
+                stream = None
+            if stream is None:
+                options.setdefault("speaker_id", session_id)
+                stream = VoiceStream(voice, **options)
+                self._streams[session_id] = stream
+            return stream
+
+    def close(self, session_id: str):
+        with self._lock:
+            self._streams.pop(session_id, None)
+        self.voice().mismatches.drop(session_id)
+
+
+_streams = VoiceStreams()
+
+
+def get_voice_streams() -> VoiceStreams:
+    return _streams